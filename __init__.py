@@ -9,30 +9,70 @@ towards CAD, engineering, and precision editing.
 BlendScript is largely expression-driven and is parsed using combinatory PEG.
 """
 
+import sys
 import traceback
-from time import time
-from sys  import stdin, setrecursionlimit
+from importlib import import_module
+from time      import time
+from sys       import stdin, setrecursionlimit
+from types     import ModuleType
+
+from .compiler.memo   import memo
+from .compiler.srcmap import locate, register_source, span_profiler
+
+from .blender.blender_objects import *
+from .blender.gc              import *
+from .blender.materials       import *
+from .blender.meshes          import *
+from .blender.mesh_cache      import use_mesh_cache
+from .blender.mesh_workers    import finish_meshes, use_parallel_meshes
+from .blender.units           import resolve_unit_scale
+from .runtime.builtins        import *
+from .runtime.fn              import memo_stats, reset_memo_stats
+from .runtime.vectorize       import use_fast_math
+from .runtime.blendermath     import *
+
+
+# The parser takes a while to import, and modules written by compile_module()
+# don't need it, so we load it the first time something does; see grammar().
+grammar_modules = ('.parsers.peg', '.parsers.val', '.parsers.bmesh',
+                   '.parsers.bobject', '.parsers.material', '.parsers.module',
+                   '.runtime.val')
+
+
+def grammar():
+  """
+  Loads the toplevel grammar, returning the parser for BlendScript
+  expressions.
+  """
+  for m in grammar_modules: import_module(m, __name__)
+  return sys.modules[__name__ + '.parsers.val'].val_expr
 
-from .parsers.peg      import pmap
-from .parsers.val      import val_expr
-from .parsers.bmesh    import *
-from .parsers.bobject  import *
-from .parsers.material import *
 
-from .blender.gc          import *
-from .runtime.val         import *
-from .runtime.blendermath import *
+def __getattr__(name):
+  # Anything else we export comes from the grammar modules
+  if name.startswith('__'): raise AttributeError(name)
+  grammar()
+  for m in grammar_modules:
+    xs = vars(sys.modules[__name__ + m])
+    if name in xs and not name.startswith('_'):
+      globals()[name] = xs[name]
+      return xs[name]
+  raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 try:
   import bpy
   def gc_objects():
+    begin_run()
     gc(bpy.data.materials)
-    gc(bpy.data.meshes)
     gc(bpy.data.objects)
 
+  def gc_unused_meshes():
+    end_run(bpy.data.meshes)
+
 except ModuleNotFoundError:
   def gc_objects(): pass
+  def gc_unused_meshes(): pass
 
 
 bl_info = {
@@ -46,41 +86,93 @@ def register(): setrecursionlimit(1048576)
 def unregister(): pass
 
 
-def compile(source, debug=False):
+def parse(source):
   """
-  Compiles the specified BlendScript source, throwing an error or returning a
-  Python function. The resulting function can be invoked on no arguments to
-  execute it, or you can provide a single expr_eval_state object to override
-  the evaluation state.
+  Parses the specified BlendScript source, throwing a SyntaxError or returning
+  the val it describes.
   """
-  t0 = time()
   if type(source) == str: source = source.encode()
-  v, i = val_expr(source, 0)
+  v, i = grammar()(source, 0)
 
   if i is None: raise SyntaxError(
     f'blendscript.compile(): failed to parse {source}')
   if i != len(source): raise SyntaxError(
     f'blendscript.compile(): failed to parse beyond {i}: {source[i:]}')
 
+  return v
+
+
+def compile(source, debug=False, profile=False, memoize=False,
+            filename='<blendscript>'):
+  """
+  Compiles the specified BlendScript source, throwing an error or returning a
+  Python function. The resulting function can be invoked on no arguments to
+  execute it, or you can provide a single expr_eval_state object to override
+  the evaluation state.
+
+  Compiled code carries BlendScript line and column numbers under the given
+  filename, so tracebacks and profilers point into the source. If profile is
+  true, the function prints the time spent in each source span after it runs.
+  If memoize is true, pure subexpressions that don't depend on anything local
+  keep their values in blendscript.memo between runs (see compiler/memo.py).
+  """
+  t0 = time()
+  if type(source) == str: source = source.encode()
+  v  = parse(source)
+
   if debug: print(f'-> {v}')
-  f = (v.t, v.compile())
+  code, smap = locate(v.code, source)
+  v = val(v.t, code)
+  register_source(filename, source)
+  f = (v.t, v.compile(filename, memoize))
   t1 = time()
 
   if t1 - t0 > 0.1:
     print(f'{t1 - t0} second(s) to parse+compile script {source}')
 
+  if profile:
+    g = f[1]
+    def profiled(*xs):
+      p = span_profiler(filename, source, smap)
+      try:     return p.run(g, *xs)
+      finally: p.report()
+    f = (f[0], profiled)
+
   return f
 
 
+def compile_module(source, filename='<blendscript>'):
+  """
+  Compiles the specified BlendScript source ahead of time, returning the
+  source of a Python module that runs it without parsing anything. See
+  compiler/aot.py.
+  """
+  from .compiler.aot import module_source
+  if type(source) == str: source = source.encode()
+  v = parse(source)
+  v = val(v.t, locate(v.code, source)[0])
+  return module_source(v, filename)
+
+
 def run(source, **kwargs):
   """
   Runs the given source directly. This is a shorthand for compile(source)().
+  source can also be a module written by compile_module(), in which case
+  nothing is parsed.
   """
   try:
-    ft, f = compile(source, **kwargs)
+    ft, f = source.compiled if isinstance(source, ModuleType) \
+       else compile(source, **kwargs)
+    resolve_unit_scale()
+    # Nothing to invalidate unless the parser has loaded modules
+    m = sys.modules.get(__name__ + '.parsers.module')
+    if m is not None: m.new_run()
+    reset_memo_stats()
     gc_objects()
     v = f()
+    gc_unused_meshes()
   finally:
+    finish_meshes()
     blender_refresh_view()
   return (ft, v)
 
@@ -1,7 +1,27 @@
 import blendscript
 import sys
 
-if sys.stdin.isatty():
+
+def usage():
+  print('usage: python -m blendscript [compile script.bs [-o script_bs.py]]',
+        file=sys.stderr)
+  sys.exit(1)
+
+
+if len(sys.argv) > 1:
+  args = sys.argv[1:]
+  if args[0] != 'compile' or len(args) not in (2, 4): usage()
+  if len(args) == 4 and args[2] != '-o': usage()
+
+  source = args[1]
+  output = args[3] if len(args) == 4 else \
+           (source[:-3] if source.endswith('.bs') else source) + '_bs.py'
+
+  sys.setrecursionlimit(1048576)
+  with open(source, 'rb') as f: code = f.read()
+  with open(output, 'w') as f: f.write(blendscript.compile_module(code, source))
+
+elif sys.stdin.isatty():
   blendscript.repl()
 else:
   t, v = blendscript.run(sys.stdin.read())
@@ -11,6 +11,7 @@ from ..compatibility import *
 from .gc              import *
 from .units           import *
 from ..compiler.types import *
+from ..compiler.val   import *
 from ..runtime.fn     import *
 
 
@@ -177,6 +178,27 @@ try:
     focal_set.clear()
 
 
+  # TODO: move this? Bind a type parser?
+  t_blendobjparent = atom_type('OBP')
+
+  def blender_add_and_focus_object(name, obj):
+    name = blender_add_object(name, obj)
+    blender_focus_on(name)
+    return name
+
+  def blender_make_invisible(obj):
+    for o in resolve_blender_object(obj):
+      o.hide_viewport = True
+    return obj
+
+  v_add_obj           = val.of_fn([t_string,         t_blendobj], t_string,   blender_add_object,           pure=False)
+  v_move_obj          = val.of_fn([t_blendobjparent, t_blendobj], t_blendobj, blender_move_to,              pure=False)
+  v_add_and_focus_obj = val.of_fn([t_string,         t_blendobj], t_string,   blender_add_and_focus_object, pure=False)
+  v_focus_obj         = val.of_fn([t_blendobj],                   t_blendobj, blender_focus_on,             pure=False)
+
+  v_make_invisible    = val.of_fn([t_blendobj], t_blendobj, blender_make_invisible, pure=False)
+
+
 except ModuleNotFoundError:
   blender_not_found()
 
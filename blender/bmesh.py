@@ -6,17 +6,23 @@ This is just a bmesh object with a sidecar of named geometry selections.
 
 
 from math      import tau
-from functools import reduce
+from functools import wraps
 
-from ..compatibility import *
-from ..runtime.fn    import method
-from .units          import *
+from ..compatibility  import *
+from ..runtime.arrays import pack_vec3
+from .units           import *
 
 
 try:
   import bmesh
   import bpy
   import mathutils as mu
+  import numpy     as np
+
+  from .kernel     import box_between, box_faces, cube_corners, no_faces, \
+                          quad_corners, quad_faces
+  from .mesh_cache import new_mesh
+  from .selection  import mesh_tables, selection_queries
 
 
   def faces_(xs): return [f for f in xs if isinstance(f, bmesh.types.BMFace)]
@@ -24,23 +30,44 @@ try:
   def verts_(xs): return [v for v in xs if isinstance(v, bmesh.types.BMVert)]
   def loops_(xs): return [l for l in xs if isinstance(l, bmesh.types.BMLoop)]
 
-  def uniq(xs):  return list(set(xs))
-  def faces(xs): return faces_(xs)
-  def edges(xs): return uniq(edges_(xs) + [e for f in faces(xs) for e in f.edges])
-  def verts(xs): return uniq(verts_(xs) + [v for e in edges(xs) for v in e.verts])
+
+  # Int layers numbering elements in the order they were created. Blender
+  # attribute names are unique across domains, so each gets its own.
+  serial_layers = ('blendscript vert serial', 'blendscript edge serial',
+                   'blendscript face serial')
+
+  def linked(x):
+    """
+    The elements directly connected to the vertex, edge, or face x.
+    """
+    if isinstance(x, bmesh.types.BMVert): return [*x.link_edges, *x.link_faces]
+    if isinstance(x, bmesh.types.BMEdge): return [*x.verts, *x.link_faces]
+    if isinstance(x, bmesh.types.BMFace): return [*x.verts, *x.edges]
+    return []
+
+  def element_verts(x):
+    """
+    The vertices of the vertex, edge, or face x.
+    """
+    return (x,) if isinstance(x, bmesh.types.BMVert) else x.verts
 
 
-  def vertices_are_disjoint(s, x):
+  def mutates(op):
     """
-    Determines whether x contains any vertices present in the set s.
+    Marks a bmesh_and_selection op that changes geometry, so batched
+    primitives are written first, and anything derived from the old geometry
+    (index tables, coordinates, spatial indexes) is dropped afterwards.
     """
-    if type(x) == bmesh.types.BMVert: return not x in s
-    for v in x.verts:
-      if v in s: return False
-    return True
+    @wraps(op)
+    def f(self, *args, **kwargs):
+      self.flush()
+      r = op(self, *args, **kwargs)
+      self.derived.clear()
+      return r
+    return f
 
 
-  class bmesh_and_selection:
+  class bmesh_and_selection(selection_queries):
     """
     A bmesh object that keeps track of the vertex, edge, and face selections
     resulting from each operation.
@@ -51,12 +78,130 @@ try:
     for instance, extrusions. When that's true the default for "r" is "_".
 
     Methods that accept "q" and "r" always position them before other arguments.
+
+    Geometry is built directly in scene units: every length that comes in
+    (vertex positions, sizes, translations) is scaled by the unit factor as
+    the op is applied, so render() doesn't need another pass over the mesh.
+
+    extremum_tolerance is how far, in scene units, a vertex can be from the
+    minimum or maximum and still be selected by a ^ query.
+
+    history_ops are the methods that store() a result, and so add an entry to
+    the history.
+
+    The create_ methods don't touch the bmesh. They add their primitive's
+    vertices and faces to a batch, and store a result list that's empty until
+    flush() writes the whole batch into the bmesh with one from_mesh() call.
+    Anything that reads or changes the geometry flushes first, so results
+    are filled in by the time a query can see them.
+
+    Every element is numbered in an int layer (see serial_layers) when it's
+    created. BMesh reuses the slots of deleted elements, but a new element's
+    layers start at zero, so the numbers tell new geometry from old: flush()
+    uses them to find its primitives, and stamp() to find what an op made.
+    created holds a list of the elements each op or primitive made, in
+    order. A state records how long created was when it was pushed, and the
+    : query is what's been made since.
     """
+    extremum_tolerance = 0.0
+    history_ops = frozenset({
+      'bind', 'context_fill', 'bridge_loops', 'extrude', 'duplicate', 'spin',
+      'create_cube', 'create_box', 'create_quad', 'create_vert',
+      'create_verts'})
+
     def __init__(self, bmesh):
       self.bmesh       = bmesh
-      self.preexisting = [set()]
+      self.scopes      = [0]
       self.bindings    = [{}]
       self.history     = []
+      self.unit        = unit_scale(1)
+      self.derived     = {}
+      self.batch       = []
+      self.retained    = None
+      self.live        = None
+      self.expiry      = {}
+      self.steps       = 0
+      self.serial      = 0
+      self.created     = []
+      for xs, n in zip(self.sequences(), serial_layers): xs.layers.int.new(n)
+      self.stamp([x for xs in self.sequences() for x in xs])
+
+    def sequences(self):
+      return self.bmesh.verts, self.bmesh.edges, self.bmesh.faces
+
+    def tables(self):
+      """
+      Returns the mesh_tables for the current geometry (see
+      blender/selection.py). Element .index values match it until the
+      geometry changes.
+      """
+      def build():
+        for xs in (self.bmesh.verts, self.bmesh.edges, self.bmesh.faces):
+          xs.index_update()
+        vs = self.bmesh.verts[:]
+        es = self.bmesh.edges[:]
+        fs = self.bmesh.faces[:]
+        ns = np.fromiter((len(f.edges) for f in fs), np.int64, len(fs))
+        ev = np.fromiter((v.index for e in es for v in e.verts), np.int64,
+                         2 * len(es))
+        fe = np.fromiter((e.index for f in fs for e in f.edges), np.int64,
+                         ns.sum())
+        return mesh_tables((vs, es, fs), ev, fe,
+                           np.concatenate([[0], np.cumsum(ns)]))
+      return self.cached('tables', build)
+
+    def coords(self):
+      """
+      Returns an (N, 3) array of vertex positions, indexed like tables().
+      """
+      def build():
+        vs = self.tables().elements[0]
+        co = np.fromiter((x for v in vs for x in v.co), np.float64, 3 * len(vs))
+        return co.reshape(-1, 3)
+      return self.cached('coords', build)
+
+    def bits(self, xs):
+      """
+      Converts a list of elements to a selection over tables(). Elements that
+      have been deleted are dropped.
+      """
+      s = self.tables().none()
+      masks = {bmesh.types.BMVert: s.v,
+               bmesh.types.BMEdge: s.e,
+               bmesh.types.BMFace: s.f}
+      for x in xs:
+        m = masks.get(type(x))
+        if m is None: continue
+        try:
+          m[x.index] = True
+        except ReferenceError:
+          pass
+      return s
+
+    def vertices(self, q):
+      """
+      Selects ('V', q) as a list. Anything but a tuple query is already a list
+      of elements, so we collect their vertices directly: going through
+      tables() would rebuild them after every op that changes the mesh.
+      """
+      if isinstance(q, tuple): return self.select(('V', q))
+      return list(dict.fromkeys(v for x in self.select(q) if x.is_valid
+                                  for v in element_verts(x)))
+
+    def scaled(self, v):
+      """
+      Converts a length or vector into scene units.
+      """
+      return mu.Vector(v) * self.unit
+
+    def scaled_matrix(self, m):
+      """
+      Conjugates a transformation matrix into scene units. Only translation is
+      affected, so 3x3 matrices pass through unchanged.
+      """
+      if len(m) < 4 or self.unit == 1: return m
+      s = mu.Matrix.Scale(self.unit, 4)
+      return s @ m @ s.inverted()
 
     def push(self):
       """
@@ -64,25 +209,15 @@ try:
       call pop(). History has no state tracking because it's already implicitly
       local if you're referring backwards.
       """
-      self.preexisting.append(set(self.select_([None])))
+      self.scopes.append(len(self.created))
       self.bindings.append({})
       return self
 
     def pop(self):
-      self.preexisting.pop()
+      self.scopes.pop()
       self.bindings.pop()
       return self
 
-    def resolve_binding(self, b):
-      """
-      Looks up b in self.bindings, preferring inner bindings to outer ones.
-      """
-      for bs in reversed(self.bindings):
-        x = bs.get(b, None)
-        if x is not None: return x
-      raise Exception(
-        f'bmesh: failed to resolve {b} (available bindings are {self.bindings})')
-
     def select(self, q):
       """
       Evaluates the selection query, returning the result. Options are:
@@ -95,70 +230,63 @@ try:
       + ['+', q1, q2, ...]: union of queries
       + ['-', q1, q2]: difference of queries
       + ['B', v1, v2]: box-select between vertices
+      + ['R', v, r]: vertices within distance r of v
       + ['F', q]: faces from query
       + ['E', q]: edges from query
       + ['V', q]: vertices from query
       + ['^x', q]: sub-select results that hit the lower bound of X coordinates
         (plus analogous operators: '^X' to upper-bound X, '^y', '^Y', '^z', and
-        '^Z')
+        '^Z'), to within extremum_tolerance
       """
       return list(self.select_(q))
 
     def select_(self, q):
+      self.flush()
       vs = self.bmesh.verts
       es = self.bmesh.edges
       fs = self.bmesh.faces
 
-      if q is None:            return set(vs[:] + es[:] + fs[:]) - self.preexisting[-1]
+      if q is None:
+        return [x for xs in self.created[self.scopes[-1]:] for x in xs
+                if x.is_valid]
       elif q == [None]:        return vs[:] + es[:] + fs[:]
       elif isinstance(q, str): return self.resolve_binding(q)
       elif isinstance(q, int): return self.history[q]
-      elif isinstance(q, tuple):
-        c = q[0]
-        if c == '*':
-          return reduce(method('intersection'),
-                        (set(self.select_(s)) for s in q[1:]))
-        elif c == '+':
-          return reduce(method('union'),
-                        (set(self.select_(s)) for s in q[1:]))
-        elif c == '-':
-          q1, q2 = (set(self.select_(s)) for s in q[1:])
-          return q1 - q2
-        elif c == 'B':
-          l, u = q[1].co, q[2].co
-          return [v for v in vs if l[0] <= v.co[0] <= u[0] and
-                                   l[1] <= v.co[1] <= u[1] and
-                                   l[2] <= v.co[2] <= u[2]]
-
-        elif c == 'F': return faces(self.select_(q[1]))
-        elif c == 'E': return edges(self.select_(q[1]))
-        elif c == 'V': return verts(self.select_(q[1]))
-
-        elif c[0] == '^':
-          vs = verts(self.select_(q[1]))
-          xs = [v.co[0] for v in vs]
-          ys = [v.co[1] for v in vs]
-          zs = [v.co[2] for v in vs]
-          xmin, xmax = (min(xs), max(xs))
-          ymin, ymax = (min(ys), max(ys))
-          zmin, zmax = (min(zs), max(zs))
-
-          if   c == '^x': return filter(lambda v: v.co[0] == xmin, vs)
-          elif c == '^X': return filter(lambda v: v.co[0] == xmax, vs)
-          elif c == '^y': return filter(lambda v: v.co[1] == ymin, vs)
-          elif c == '^Y': return filter(lambda v: v.co[1] == ymax, vs)
-          elif c == '^z': return filter(lambda v: v.co[2] == zmin, vs)
-          elif c == '^Z': return filter(lambda v: v.co[2] == zmax, vs)
+      elif isinstance(q, tuple): return self.tables().members(self.query(q))
 
       raise Exception(f'unsupported bmesh query: {q}')
 
+    def retain(self, names, last):
+      """
+      Limits what store() keeps to the binding names in names and the history
+      entries in last, a dict from history index to the step of the entry's
+      last use. Each op is a step; see advance().
+      """
+      self.retained = names
+      self.live     = set(last)
+      self.expiry   = {}
+      for k, step in last.items(): self.expiry.setdefault(step, []).append(k)
+      return self
+
+    def advance(self):
+      """
+      Ends a step, releasing history entries that nothing later refers to.
+      """
+      for k in self.expiry.pop(self.steps, ()): self.history[k] = None
+      self.steps += 1
+      return self
+
     def store(self, r, xs):
       """
       Stores the specified result set into a subset, ignoring if r == None. Adds
-      the result to the history list in either case.
+      the result to the history list in either case. After retain(), results
+      that nothing will refer to are dropped, although they still take up a
+      history index.
       """
-      if r is not None: self.bindings[-1][r] = xs
-      self.history.append(xs)
+      if r is not None and (self.retained is None or r in self.retained):
+        self.bindings[-1][r] = xs
+      self.history.append(
+        xs if self.live is None or len(self.history) in self.live else None)
       return self
 
     def bind(self, q, r):
@@ -173,37 +301,44 @@ try:
       Creates a new mesh datablock and renders this bmesh object into it. Doing
       this will render this bmesh wrapper unusable for further interaction.
       """
-      m = bpy.data.meshes.new(name)
-
-      # Scale the entire geometry to match desired units
-      bmesh.ops.transform(self.bmesh,
-                          matrix=mu.Matrix.Scale(unit_scale(1), 3),
-                          verts=self.bmesh.verts)
+      return self.render_into(bpy.data.meshes.new(name))
 
+    def render_into(self, m):
+      """
+      Like render(), but replaces the geometry of the existing mesh m.
+      """
+      self.flush()
+      for xs, n in zip(self.sequences(), serial_layers):
+        xs.layers.int.remove(xs.layers.int[n])
       self.bmesh.to_mesh(m)
       self.bmesh.free()
       self.bmesh = None
       m.update()
       return m
 
+    @mutates
     def context_fill(self, q=None, r=None):
       ret = bmesh.ops.contextual_create(self.bmesh, geom=self.select(q))
-      self.store(r, ret['edges'] + ret['faces'])
+      self.store(r, self.stamp(ret['edges'] + ret['faces']))
       return self
 
+    @mutates
     def bridge_loops(self, q, r):
-      ret = bmesh.ops.bridge_loops(self.bmesh, edges=edges(self.select(q)))
-      self.store(r, ret['edges'] + ret['faces'])
+      ret = bmesh.ops.bridge_loops(self.bmesh, edges=self.select(('E', q)))
+      self.store(r, self.stamp(ret['edges'] + ret['faces']))
       return self
 
+    @mutates
     def transform(self, q, m):
-      bmesh.ops.transform(self.bmesh, matrix=m, verts=verts(self.select(q)))
+      bmesh.ops.transform(self.bmesh, matrix=self.scaled_matrix(m),
+                          verts=self.vertices(q))
       return self
 
     def grab(self, q, v):
       self.transform(q, mu.Matrix.Translation(mu.Vector(v)))
       return self
 
+    @mutates
     def extrude(self, q, r):
       """
       Multipurpose extrude. Delegates to individual bmesh methods to extrude
@@ -215,88 +350,186 @@ try:
       displacement operation would modify the un-extruded geometry due to
       inclusive selection.
       """
-      q  = self.select(q)
-      qf = faces_(q)
-      qe = edges_(q)
-      qv = verts_(q)
-
-      ivs = verts(q)
-
-      rg = []
-      if len(qf):
-        rg += [f for f in bmesh.ops.extrude_discrete_faces(self.bmesh, faces=qf)['faces']
-                 if vertices_are_disjoint(ivs, f)]
-
-      if len(qe):
-        rg += [x for x in bmesh.ops.extrude_edge_only(self.bmesh, edges=qe)['geom']
-                 if vertices_are_disjoint(ivs, x)]
-
-      if len(qv):
-        rv = bmesh.ops.extrude_vert_indiv(self.bmesh, verts=qv)
-        rg += [e for e in rv['edges']
-                 if vertices_are_disjoint(ivs, e)] + rv['verts']
-
-      self.store(r, rg)
+      q   = self.select(q)
+      qf  = faces_(q)
+      qe  = edges_(q)
+      qv  = verts_(q)
+      ivs = {v for x in q if x.is_valid for v in element_verts(x)}
+
+      rf = bmesh.ops.extrude_discrete_faces(self.bmesh, faces=qf)['faces'] \
+           if len(qf) else []
+      rg = bmesh.ops.extrude_edge_only(self.bmesh, edges=qe)['geom'] \
+           if len(qe) else []
+      rv = bmesh.ops.extrude_vert_indiv(self.bmesh, verts=qv) \
+           if len(qv) else {'edges': [], 'verts': []}
+
+      self.stamp(rf + rg + rv['edges'] + rv['verts'])
+
+      # Keep the new elements that don't touch the input vertices
+      rs = [x for x in dict.fromkeys(rf + rg + rv['edges'])
+            if ivs.isdisjoint(element_verts(x))]
+      self.store(r, verts_(rs) + edges_(rs) + faces_(rs) + rv['verts'])
       return self
 
+    @mutates
     def delete(self, q):
-      q = self.select(q)
-      bmesh.ops.delete(self.bmesh, geom=verts(q), context='VERTS')
-      bmesh.ops.delete(self.bmesh, geom=edges(q), context='EDGES')
-      bmesh.ops.delete(self.bmesh, geom=faces(q), context='FACES_KEEP_BOUNDARY')
+      t = self.tables()
+      s = self.query(q)
+      vs, es, fs = (t.members(k(s)) for k in (t.verts, t.edges, t.faces))
+      bmesh.ops.delete(self.bmesh, geom=vs, context='VERTS')
+      bmesh.ops.delete(self.bmesh, geom=[e for e in es if e.is_valid],
+                       context='EDGES')
+      bmesh.ops.delete(self.bmesh, geom=[f for f in fs if f.is_valid],
+                       context='FACES_KEEP_BOUNDARY')
       return self
 
-    def create_cube(self, r, dv=mu.Vector((1, 1, 1))):
-      ret = bmesh.ops.create_cube(self.bmesh, size=1, matrix=mu.Matrix.Diagonal(dv))
-      self.store(r, ret['verts'])
+    def add_primitive(self, r, co, faces, everything=False):
+      """
+      Batches a primitive made of the (N, 3) vertex positions co (in scene
+      units) and the (F, 4) quads faces, and stores its result: its vertices,
+      or with everything=True its vertices, edges, and faces.
+      """
+      rs, made = [], []
+      self.batch.append((np.asarray(co, dtype=np.float64).reshape(-1, 3),
+                         faces, rs, everything, made))
+      self.created.append(made)
+      self.store(r, rs)
       return self
 
-    def create_box(self, r, v1=mu.Vector((0, 0, 0)), v2=mu.Vector((1, 1, 1))):
-      scale_matrix = mu.Matrix.Diagonal(v2 - v1)
-      ret = bmesh.ops.create_cube(self.bmesh, size=1, matrix=scale_matrix)
-      bmesh.ops.translate(self.bmesh,
-                          verts=ret['verts'],
-                          vec=v1 + scale_matrix @ mu.Vector((0.5, 0.5, 0.5)))
-
-      self.store(r, ret['verts'])
+    def flush(self):
+      """
+      Writes the batched primitives into the bmesh and fills in their results.
+      The geometry goes through a scratch mesh written with foreach_set(), so
+      the cost is a few bulk copies however many primitives there are.
+      """
+      if not self.batch: return self
+      batch, self.batch = self.batch, []
+
+      starts = np.cumsum([0] + [len(b[0]) for b in batch])
+      co = np.concatenate([b[0] for b in batch])
+      qs = np.concatenate([b[1] + i for b, i in zip(batch, starts)]) \
+             .astype(np.int32)
+      m  = new_mesh('blendscript batch', {
+        'co':         co.astype(np.float32).ravel(),
+        'edges':      np.zeros(0, dtype=np.int32),
+        'loop_start': np.arange(0, qs.size, 4, dtype=np.int32),
+        'loop_total': np.full(len(qs), 4, dtype=np.int32),
+        'loop_verts': qs.ravel()})
+
+      s0, nv = self.serial, len(co)
+      self.serial += nv + len(qs)
+      ss = s0 + 1 + np.arange(nv + len(qs), dtype=np.int32)
+      for n, domain, xs in zip(serial_layers[::2], ('POINT', 'FACE'),
+                               (ss[:nv], ss[nv:])):
+        m.attributes.new(n, 'INT', domain).data.foreach_set('value', xs)
+
+      n0 = len(self.bmesh.verts)
+      f0 = len(self.bmesh.faces)
+      self.bmesh.from_mesh(m)
+      bpy.data.meshes.remove(m)
+      self.derived.clear()
+
+      vs = self.numbered(self.bmesh.verts, n0, serial_layers[0], s0, nv)
+      fs = self.numbered(self.bmesh.faces, f0, serial_layers[2], s0 + nv,
+                         len(qs))
+      el = self.bmesh.edges.layers.int[serial_layers[1]]
+      nf = 0
+      for (co, faces, rs, everything, made), i in zip(batch, starts):
+        pvs = vs[i:i + len(co)]
+        pfs = fs[nf:nf + len(faces)]
+        pes = list(dict.fromkeys(e for f in pfs for e in f.edges))
+        for e in pes:
+          self.serial += 1
+          e[el] = self.serial
+        made += pvs + pes + pfs
+        rs   += made if everything else pvs
+        nf   += len(faces)
       return self
 
-    def create_quad(self, r, du=mu.Vector((1, 0, 0)), dv=mu.Vector((0, 1, 0))):
-      v0 = bmesh.ops.create_vert(self.bmesh, co=mu.Vector((0, 0, 0)))['vert'][0]
-      v1 = bmesh.ops.extrude_vert_indiv(self.bmesh, verts=[v0])
-      v2 = bmesh.ops.extrude_vert_indiv(self.bmesh, verts=v1['verts'])
-      v3 = bmesh.ops.extrude_vert_indiv(self.bmesh, verts=v2['verts'])
+    def stamp(self, xs):
+      """
+      Numbers the unnumbered elements in or next to xs, and everything
+      unnumbered connected to them, and adds a list of them to created;
+      returns xs.
+      Called with what an op returns, this finds everything the op made, even
+      what it doesn't return (like the sides of an extrusion), and takes time
+      in proportion to that rather than to the mesh, since it stops at
+      elements that already have numbers.
+      """
+      ls = {bmesh.types.BMVert: self.bmesh.verts.layers.int[serial_layers[0]],
+            bmesh.types.BMEdge: self.bmesh.edges.layers.int[serial_layers[1]],
+            bmesh.types.BMFace: self.bmesh.faces.layers.int[serial_layers[2]]}
+      todo = [y for x in xs for y in (x, *linked(x))]
+      made = []
+      while todo:
+        x = todo.pop()
+        l = ls.get(type(x))
+        if l is None or not x.is_valid or x[l]: continue
+        self.serial += 1
+        x[l] = self.serial
+        made.append(x)
+        todo += linked(x)
+      self.created.append(made)
+      return xs
+
+    def numbered(self, xs, n0, layer, s0, n):
+      """
+      Returns the n elements of the sequence xs that flush() numbered s0 + 1
+      through s0 + n, in that order. They're usually the ones past the first
+      n0, but BMesh reuses the slots of deleted elements, so when they aren't
+      we look through all of xs.
+      """
+      l = xs.layers.int[layer]
+      r = [None] * n
+      xs.ensure_lookup_table()
+      for ys in (xs[n0:], xs):
+        for y in ys:
+          i = y[l] - s0 - 1
+          if 0 <= i < n: r[i] = y
+        if None not in r: break
+      return r
 
-      vs = [v0]
-      for v in [v1, v2, v3]: vs += v['verts']
+    def create_cube(self, r, dv=mu.Vector((1, 1, 1))):
+      return self.add_primitive(r, cube_corners(np.array(self.scaled(dv))),
+                                box_faces)
 
-      bmesh.ops.translate(self.bmesh, vec=du, verts=[vs[1], vs[2]])
-      bmesh.ops.translate(self.bmesh, vec=dv, verts=[vs[2], vs[3]])
-      ret = bmesh.ops.contextual_create(self.bmesh, geom=[vs[0], vs[3]])
+    def create_box(self, r, v1=mu.Vector((0, 0, 0)), v2=mu.Vector((1, 1, 1))):
+      v1, v2 = np.array(self.scaled(v1)), np.array(self.scaled(v2))
+      return self.add_primitive(r, box_between(v1, v2), box_faces)
 
-      rv = vs + ret['edges'] + ret['faces']
-      for v in [v1, v2, v3]: rv += v['edges']
-      self.store(r, rv)
-      return self
+    def create_quad(self, r, du=mu.Vector((1, 0, 0)), dv=mu.Vector((0, 1, 0))):
+      du, dv = np.array(self.scaled(du)), np.array(self.scaled(dv))
+      return self.add_primitive(r, quad_corners(du, dv), quad_faces,
+                                everything=True)
 
     def create_vert(self, r, v=mu.Vector((0, 0, 0))):
-      ret = bmesh.ops.create_vert(self.bmesh, co=v)
-      self.store(r, ret['vert'])
-      return self
+      return self.add_primitive(r, np.array(self.scaled(v)), no_faces)
+
+    def create_verts(self, r, vs):
+      """
+      Creates a vertex at each point in vs, a [V3] list.
+      """
+      return self.add_primitive(r, pack_vec3(vs).data * self.unit, no_faces)
 
+    @mutates
     def duplicate(self, q, r):
       ret = bmesh.ops.duplicate(self.bmesh, geom=self.select(q))
-      self.store(r, ret['geom'])
+      self.store(r, self.stamp(ret['geom']))
       return self
 
+    @mutates
     def spin(self, q, r, angle=tau, steps=45,
             center=mu.Vector((0, 0, 0)),
             axis=mu.Vector((0, 0, 1)),
             delta=mu.Vector((0, 0, 0))):
-      ret = bmesh.ops.spin(self.bmesh, geom=self.select(q),
-                           cent=center, axis=axis, dvec=delta,
-                           angle=angle, steps=steps, use_merge=True)
-      self.store(r, ret['geom_last'])
+      geom = self.select(q)
+      ret  = bmesh.ops.spin(self.bmesh, geom=geom,
+                            cent=self.scaled(center), axis=axis,
+                            dvec=self.scaled(delta),
+                            angle=angle, steps=steps, use_merge=True)
+      # A full turn merges the last step into geom, so start from both
+      self.stamp(geom)
+      self.store(r, self.stamp(ret['geom_last']))
       return self
 
 
@@ -1,32 +1,124 @@
 """
 Automatic removal of obsolete objects, and content hashing for memoization.
+
+Generated datablocks are named after a structural hash of whatever they were
+generated from, so a rerun that asks for the same thing can find and reuse
+the datablock from the last run instead of building it again. Objects and
+materials are swept before each run; hashed datablocks are swept after it,
+keeping the ones the run asked for (see begin_run() and end_run()).
 """
 
-from ..compatibility import *
+from hashlib import blake2b
+from struct  import pack
+
+from ..compatibility  import *
+from ..runtime.arrays import packed_array, vec3_array
+from ..runtime.fn     import preloaded_method, stream
+
+
+class unhashable(Exception): pass
+
+
+def hash_into(h, x):
+  """
+  Feeds a type-tagged encoding of x into the hash object h. Raises unhashable
+  for values with no stable structure, like arbitrary functions. Streams (the
+  results of f * xs and f % xs) and ranges hash as the tuples they stand for;
+  op lists are pure values by the time they're hashed, so iterating a stream
+  here gives the same elements the mesh is built from.
+  """
+  if isinstance(x, (stream, range)): x = tuple(x)
+  t = type(x)
+  if x is None or t is bool or t is str:
+    h.update(f'{t.__name__}:{x!r};'.encode())
+  elif isinstance(x, int):
+    h.update(b'i%d;' % x)
+  elif isinstance(x, float):
+    h.update(b'f' + pack('<d', x))
+  elif t is vec3_array:
+    h.update(b'v3:%d;' % len(x))
+    h.update(x.data.tobytes())
+  elif t is packed_array:
+    h.update(f'pa:{x.data.format}:{len(x)};'.encode())
+    h.update(x.data.tobytes())
+  elif t is preloaded_method:
+    h.update(f'op:{x.name}('.encode())
+    for a in x.args: hash_into(h, a)
+    for k in sorted(x.kwargs):
+      h.update(f'{k}='.encode())
+      hash_into(h, x.kwargs[k])
+    h.update(b')')
+  elif t is tuple or t is list or t.__name__ in ('Vector', 'Matrix',
+                                                 'Quaternion', 'Euler'):
+    # mathutils values (or their NumPy stand-ins) are sequences of numbers or
+    # rows; the type name keeps a Vector from hashing like a tuple
+    h.update(f'{t.__name__}[{len(x)};'.encode())
+    for y in x: hash_into(h, y)
+    h.update(b']')
+  else:
+    raise unhashable(t.__name__)
+
+
+def content_hash(x):
+  """
+  Returns a hex digest of x's structure that's the same in every process, or
+  None if x contains something we can't hash structurally.
+  """
+  h = blake2b(digest_size=16)
+  try:
+    hash_into(h, x)
+  except unhashable:
+    return None
+  return h.hexdigest()
+
+
+unhashed_name = '_unhashed'
 
 
 try:
   import bpy
 
+  live_names = set()
+
   def gc_tag(o):
     o['blendscript/gc'] = True
     return o
 
   def gc(collection, live_set=set()):
-    for o in collection:
-      if o.get('blendscript/gc') is not None and o not in live_set:
+    """
+    Removes the tagged datablocks in collection whose names aren't in
+    live_set.
+    """
+    for o in list(collection):
+      if o.get('blendscript/gc') is not None and o.name not in live_set:
         collection.remove(o)
 
-  def add_hashed(collection, source, generator):
-    name = f'_{abs(hash(source)):016x}'
+  def begin_run():
+    live_names.clear()
 
-    # TODO: figure out why memoizing this function results in unstable output
-    # in Blender. Uncommenting the next line does the right thing 90% of the
-    # time, but the other 10% associates objects incorrectly.
-    #
-    # if name in collection: return collection[name]
+  def end_run(collection):
+    """
+    Sweeps the hashed datablocks in collection that the run didn't use.
+    """
+    gc(collection, live_names)
 
-    return gc_tag(generator(source, name))
+  def add_hashed(collection, source, generator):
+    """
+    Returns the datablock generator(source, name) makes, reusing the one named
+    for source's content hash (_ followed by the hex digest) if a previous call
+    already made it. Sources that can't be hashed are generated every time,
+    named unhashed_name.
+    """
+    k = content_hash(source)
+    if k is None:
+      o = gc_tag(generator(source, unhashed_name))
+    else:
+      name = f'_{k}'
+      o = collection.get(name)
+      if o is None or o.get('blendscript/gc') is None:
+        o = gc_tag(generator(source, name))
+    live_names.add(o.name)
+    return o
 
 
 except ModuleNotFoundError:
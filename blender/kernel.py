@@ -0,0 +1,415 @@
+"""
+A bpy-free geometry kernel for mesh op lists.
+
+With use_parallel_meshes(), make_bmesh() sends each op list this kernel
+supports to a worker process (see blender/mesh_workers.py) instead of
+replaying it with bmesh ops on Blender's main thread. Workers can't import
+bpy, so array_mesh reimplements those ops on NumPy arrays: the create_
+primitives, transform and grab, extrude and duplicate, and bind, with every
+query except B and R, whose arguments are Blender vertices. Op lists that use
+anything else (spin, fills, deletion) are generated with bmesh as before.
+
+A worker returns its mesh as one shared memory block holding the arrays
+that mesh_cache.mesh_arrays() would read from the finished mesh, so the main
+thread copies them straight into a Blender mesh with foreach_set().
+
+The primitives' geometry is defined here for both paths, so a mesh comes out
+the same whichever one builds it. Extrusions and duplicates have the same
+geometry either way, although their elements may come out in another order.
+"""
+
+from contextlib                   import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from ..runtime.arrays import transform_rows, vec3_array
+from ..runtime.fn     import preloaded_method
+from .selection       import mesh_tables, selection_queries
+
+
+# Corner i of a box is at bit i & 1 in x, i & 2 in y, and i & 4 in z. Faces
+# are quads indexing the primitive's vertices, wound outward.
+box_corners = np.array([[i & 1, i >> 1 & 1, i >> 2 & 1] for i in range(8)],
+                       dtype=np.float64)
+box_faces   = np.array([[0, 2, 3, 1], [4, 5, 7, 6], [0, 1, 5, 4],
+                        [2, 6, 7, 3], [0, 4, 6, 2], [1, 3, 7, 5]])
+quad_faces  = np.array([[0, 1, 2, 3]])
+no_faces    = np.zeros((0, 4), dtype=np.int64)
+
+def cube_corners(d):     return (box_corners - 0.5) * d
+def box_between(v1, v2): return v1 + box_corners * (v2 - v1)
+def quad_corners(du, dv): return np.array([0 * du, du, du + dv, dv])
+
+
+def quad_edges(faces):
+  """
+  Returns the edges of the (F, 4) quads faces as an (E, 2) array of vertex
+  pairs, and an (F, 4) array of each face's edge indexes.
+  """
+  pairs = np.stack([faces, np.roll(faces, -1, axis=1)], axis=-1)
+  es, inverse = np.unique(np.sort(pairs.reshape(-1, 2), axis=1), axis=0,
+                          return_inverse=True)
+  return es.reshape(-1, 2), inverse.reshape(-1, 4)
+
+
+class unsupported(Exception): pass
+
+
+class array_mesh(selection_queries):
+  """
+  The subset of bmesh_and_selection that the kernel supports, on arrays.
+  Elements are indexes: co is (N, 3), edges (E, 2), faces (F, 4) quads, and
+  face_edges (F, 4), where a face's edge k runs from its vertex k to vertex
+  k + 1. Results are (verts, edges, faces) tuples of index arrays, and a
+  state's preexisting geometry is just the element counts when it was
+  pushed. New geometry is batched and concatenated when something reads the
+  arrays.
+
+  Nothing is ever deleted, so indexes are stable. Face extrusion replaces
+  faces, which it lists in removed; they drop out of every query, and out of
+  arrays().
+  """
+  extremum_tolerance = 0.0
+  ops = frozenset({'bind', 'transform', 'grab', 'extrude', 'duplicate',
+                   'create_cube', 'create_box', 'create_quad', 'create_vert',
+                   'create_verts'})
+
+  def __init__(self, unit=1):
+    self.unit        = unit
+    self.co          = np.zeros((0, 3))
+    self.edges       = np.zeros((0, 2), dtype=np.int64)
+    self.faces       = no_faces
+    self.face_edges  = no_faces
+    self.counts      = (0, 0, 0)
+    self.removed     = np.zeros(0, dtype=np.int64)
+    self.batch       = []
+    self.preexisting = [self.counts]
+    self.bindings    = [{}]
+    self.history     = []
+    self.derived     = {}
+
+  def flush(self):
+    if not self.batch: return self
+    batch, self.batch = self.batch, []
+    self.co, self.edges, self.faces, self.face_edges = (
+      np.concatenate([x] + [b[i] for b in batch])
+      for i, x in enumerate((self.co, self.edges, self.faces, self.face_edges)))
+    self.derived.clear()
+    return self
+
+  def tables(self):
+    def build():
+      nv, ne, nf = self.counts
+      return mesh_tables((range(nv), range(ne), range(nf)), self.edges,
+                         self.face_edges.ravel(),
+                         np.arange(0, 4 * nf + 1, 4))
+    return self.cached('tables', build)
+
+  def coords(self):
+    self.flush()
+    return self.co
+
+  def bits(self, p):     return self.tables().none(*self.live(p))
+  def picked(self, s):   return tuple(map(np.flatnonzero, (s.v, s.e, s.f)))
+  def select(self, q):   return self.live(self.select_(q))
+
+  def live(self, p):
+    """
+    Drops removed faces from the result p.
+    """
+    v, e, f = p
+    return v, e, f[~np.isin(f, self.removed)]
+
+  def select_(self, q):
+    if q is None:
+      return tuple(np.arange(a, b) for a, b in zip(self.preexisting[-1],
+                                                   self.counts))
+    elif q == [None]:        return tuple(map(np.arange, self.counts))
+    elif isinstance(q, str): return self.resolve_binding(q)
+    elif isinstance(q, int): return self.history[q]
+    elif isinstance(q, tuple): return self.picked(self.query(q))
+    raise unsupported(f'bmesh query {q}')
+
+  def push(self):
+    self.preexisting.append(self.counts)
+    self.bindings.append({})
+    return self
+
+  def pop(self):
+    self.preexisting.pop()
+    self.bindings.pop()
+    return self
+
+  def store(self, r, p):
+    if r is not None: self.bindings[-1][r] = p
+    self.history.append(p)
+    return self
+
+  def bind(self, q, r):
+    return self.store(r, self.select(q))
+
+  def transform(self, q, m):
+    vs = np.flatnonzero(self.tables().verts(self.query(q)).v)
+    m  = np.array(m, dtype=np.float64)
+    if m.shape == (4, 4): m[:3, 3] *= self.unit
+    self.co[vs] = transform_rows(m, self.co[vs])
+    self.derived.clear()
+    return self
+
+  def grab(self, q, v):
+    m = np.identity(4)
+    m[:3, 3] = v
+    return self.transform(q, m)
+
+  def append(self, co, edges, faces, face_edges):
+    """
+    Adds geometry to the batch, with edges, faces, and face_edges indexing
+    the whole mesh. Returns the new elements.
+    """
+    old = self.counts
+    self.batch.append((co, edges, faces, face_edges))
+    self.counts = tuple(n + len(x) for n, x in zip(old, (co, edges, faces)))
+    return tuple(np.arange(a, b) for a, b in zip(old, self.counts))
+
+  def add_primitive(self, r, co, faces, everything=False):
+    nv, ne, _ = self.counts
+    co     = co.reshape(-1, 3)
+    es, fe = quad_edges(faces)
+    p = self.append(co, es + nv, faces + nv, fe + ne)
+    return self.store(r, p if everything else (p[0], p[1][:0], p[2][:0]))
+
+  def extrude(self, q, r):
+    """
+    Extrudes faces, edges, and vertices as bmesh_and_selection.extrude()
+    does, each with the bmesh op it uses, and stores the same result: the
+    extruded faces, the copies of the edges and their vertices, and the
+    copies of the vertices. Each step sees what the last one made, as it
+    would with bmesh.
+    """
+    vs, es, fs = self.select(q)
+    rf = self.extrude_faces(fs)
+    rv, re = self.extrude_edges(es)
+    return self.store(r, (np.concatenate([rv, self.extrude_verts(vs)]), re,
+                          rf))
+
+  def extrude_faces(self, fs):
+    """
+    extrude_discrete_faces: gives each face in fs its own copies of its
+    vertices and edges, joins each edge to its copy with a quad, and replaces
+    the face with one on the copies. Returns the new faces.
+    """
+    n = len(fs)
+    if not n: return fs
+    self.flush()
+    nv, ne, _ = self.counts
+    fv = self.faces[fs]
+    k  = np.arange(4 * n).reshape(n, 4)
+    cv = nv + k            # copies of fv
+    ce = ne + k            # copied edges, from cv[:, i] to cv[:, i + 1]
+    se = ne + 4 * n + k    # side edges, from fv[:, i] to cv[:, i]
+    nx = lambda a: np.roll(a, -1, axis=1)
+    sides = np.stack([nx(fv), nx(cv), cv, fv], axis=-1).reshape(-1, 4)
+    side_edges = np.stack([nx(se), ce, se, self.face_edges[fs]],
+                          axis=-1).reshape(-1, 4)
+    _, _, nf = self.append(
+      self.co[fv].reshape(-1, 3),
+      np.concatenate([np.stack([cv, nx(cv)], axis=-1).reshape(-1, 2),
+                      np.stack([fv, cv], axis=-1).reshape(-1, 2)]),
+      np.concatenate([cv, sides]),
+      np.concatenate([ce, side_edges]))
+    self.removed = np.union1d(self.removed, fs)
+    return nf[:n]
+
+  def extrude_edges(self, es):
+    """
+    extrude_edge_only: copies the edges in es and their vertices, and joins
+    each edge to its copy with a quad, wound against a face the edge already
+    has. Returns the new vertices and edges.
+    """
+    if not len(es): return es, es
+    self.flush()
+    nv, ne, _ = self.counts
+    vs, ev = np.unique(self.edges[es], return_inverse=True)
+    ev = ev.reshape(-1, 2)
+    a, b = self.edges[es].T
+    ca, cb = (nv + ev).T
+    n = len(es)
+    ce = ne + np.arange(n)            # copies, from ca to cb
+    se = ne + n + ev                  # side edges, from vs to its copy
+
+    # The first vertex of each edge along some live face that has it, or -1
+    start = np.full(ne, -1)
+    alive = np.setdiff1d(np.arange(len(self.faces)), self.removed)
+    start[self.face_edges[alive].ravel()] = self.faces[alive].ravel()
+    back = start[es] == b
+    pick = lambda x, y: (np.where(back, x, y), np.where(back, y, x))
+    s1, s2 = pick(a, b)
+    c1, c2 = pick(ca, cb)
+    e1, e2 = pick(*se.T)
+    sides = np.stack([s1, s2, c2, c1], axis=1)
+    side_edges = np.stack([es, e2, ce, e1], axis=1)
+    rv, re, _ = self.append(
+      self.co[vs],
+      np.concatenate([np.stack([ca, cb], axis=1),
+                      np.stack([vs, nv + np.arange(len(vs))], axis=1)]),
+      sides, side_edges)
+    return rv, re[:n]
+
+  def extrude_verts(self, vs):
+    """
+    extrude_vert_indiv: joins each vertex in vs to a new copy of it with an
+    edge. Returns the copies.
+    """
+    if not len(vs): return vs
+    self.flush()
+    nv, _, _ = self.counts
+    rv, _, _ = self.append(self.co[vs], np.stack([vs, nv + np.arange(len(vs))],
+                                                 axis=1), no_faces, no_faces)
+    return rv
+
+  def duplicate(self, q, r):
+    """
+    Copies the selected faces, edges, and vertices, with the edges and
+    vertices they use, and stores the copies.
+    """
+    vs, es, fs = self.select(q)
+    self.flush()
+    nv, ne, _ = self.counts
+    es = np.union1d(es, self.face_edges[fs])
+    vs = np.union1d(vs, self.edges[es])
+    vmap = np.full(nv, -1)
+    emap = np.full(ne, -1)
+    vmap[vs] = nv + np.arange(len(vs))
+    emap[es] = ne + np.arange(len(es))
+    return self.store(r, self.append(self.co[vs], vmap[self.edges[es]],
+                                     vmap[self.faces[fs]],
+                                     emap[self.face_edges[fs]]))
+
+  def scaled(self, v): return np.array(v, dtype=np.float64) * self.unit
+
+  def create_cube(self, r, dv=(1, 1, 1)):
+    return self.add_primitive(r, cube_corners(self.scaled(dv)), box_faces)
+
+  def create_box(self, r, v1=(0, 0, 0), v2=(1, 1, 1)):
+    return self.add_primitive(r, box_between(self.scaled(v1), self.scaled(v2)),
+                              box_faces)
+
+  def create_quad(self, r, du=(1, 0, 0), dv=(0, 1, 0)):
+    return self.add_primitive(r, quad_corners(self.scaled(du), self.scaled(dv)),
+                              quad_faces, everything=True)
+
+  def create_vert(self, r, v=(0, 0, 0)):
+    return self.add_primitive(r, self.scaled(v), no_faces)
+
+  def create_verts(self, r, vs):
+    return self.add_primitive(r, self.scaled(vs).reshape(-1, 3), no_faces)
+
+  def arrays(self):
+    """
+    The mesh, in the layout of mesh_cache.mesh_arrays().
+    """
+    self.flush()
+    fs = np.delete(self.faces, self.removed, axis=0)
+    return {'co':         self.co.astype(np.float32).ravel(),
+            'edges':      self.edges.astype(np.int32).ravel(),
+            'loop_start': np.arange(0, fs.size, 4, dtype=np.int32),
+            'loop_total': np.full(len(fs), 4, dtype=np.int32),
+            'loop_verts': fs.astype(np.int32).ravel()}
+
+
+def plain(x):
+  """
+  Converts an op argument to picklable values the kernel understands.
+  """
+  t = type(x)
+  if x is None or t in (bool, int, float, str): return x
+  if t is vec3_array:                           return x.data
+  if t is list:                                 return list(map(plain, x))
+  if t is tuple or t.__name__ in ('Vector', 'Matrix'):
+    return tuple(map(plain, x))
+  if isinstance(x, (int, float)):               return x
+  raise unsupported(t.__name__)
+
+
+def geometric_query(q):
+  return isinstance(q, tuple) and (q[0] in ('B', 'R')
+                                   or any(map(geometric_query, q[1:])))
+
+
+def describe(op):
+  """
+  Returns the op tree op as nested lists of (name, kwargs) for run_ops(), or
+  None if the kernel can't run all of it.
+  """
+  def d(op):
+    if getattr(op, '__iter__', None): return [d(o) for o in op]
+    if not isinstance(op, preloaded_method) or op.name not in array_mesh.ops \
+       or op.args or geometric_query(op.kwargs.get('q')):
+      raise unsupported(op)
+    return (op.name, {k: plain(v) for k, v in op.kwargs.items()})
+  try:
+    return d(op)
+  except unsupported:
+    return None
+
+
+def run_ops(m, op):
+  if isinstance(op, list):
+    m.push()
+    for o in op: run_ops(m, o)
+    return m.pop()
+  name, kwargs = op
+  return getattr(m, name)(**kwargs)
+
+
+def generate(tree, unit):
+  """
+  Worker side: runs a describe()d op tree and returns the resulting arrays in
+  shared memory, as a handle for attached().
+  """
+  arrays = run_ops(array_mesh(unit), tree).arrays()
+  shm    = SharedMemory(create=True,
+                        size=max(1, sum(a.nbytes for a in arrays.values())))
+  layout, offset = [], 0
+  try:
+    for k, a in arrays.items():
+      np.ndarray(a.shape, a.dtype, buffer=shm.buf, offset=offset)[...] = a
+      layout.append((k, a.dtype.str, a.shape, offset))
+      offset += a.nbytes
+  except BaseException:
+    shm.close()
+    shm.unlink()
+    raise
+  shm.close()
+  return shm.name, layout
+
+
+def release(future):
+  """
+  Frees the shared memory block of a finished generate() call, if it made
+  one and it hasn't been freed already; for future.add_done_callback().
+  """
+  try:
+    with attached(future.result()): pass
+  except BaseException:
+    pass
+
+
+@contextmanager
+def attached(handle):
+  """
+  Main side: yields the arrays generate() returned, as views of its shared
+  memory block, and frees the block afterwards.
+  """
+  name, layout = handle
+  shm    = SharedMemory(name=name)
+  arrays = {}
+  try:
+    arrays.update((k, np.ndarray(shape, dtype, buffer=shm.buf, offset=offset))
+                  for k, dtype, shape, offset in layout)
+    yield arrays
+  finally:
+    arrays.clear()
+    shm.close()
+    shm.unlink()
@@ -0,0 +1,163 @@
+"""
+Persistent cache of generated mesh geometry.
+
+add_hashed() reuses a mesh within a Blender session, but a new session
+regenerates every mesh from its ops. With a cache directory set, each mesh
+that make_bmesh() generates is also written there as an .npz file of its
+vertex positions, edges, and faces, named for the content hash of its ops
+(see blender/gc.py). A later session that asks for the same mesh reads the
+arrays and writes them into a new mesh with bulk foreach_set() calls, without
+replaying any bmesh ops.
+
+use_mesh_cache('//meshes') turns the cache on; // is relative to the .blend
+file. Files are evicted least recently used first once the directory holds
+more than budget bytes of them. A file that can't be read is deleted and the
+mesh is regenerated.
+"""
+
+import os
+
+from ..compatibility import *
+from .gc             import unhashed_name
+
+
+cache_dir    = None
+cache_budget = 1 << 30
+
+
+def use_mesh_cache(path, budget=1 << 30):
+  """
+  Stores generated meshes in the directory at path, keeping at most budget
+  bytes of them. use_mesh_cache(None) turns the cache off.
+  """
+  global cache_dir, cache_budget
+  if path is not None:
+    path = os.path.abspath(blend_relative(path) if path.startswith('//')
+                           else path)
+    os.makedirs(path, exist_ok=True)
+  cache_dir    = path
+  cache_budget = budget
+
+
+def cache_path(name):
+  """
+  The cache file for the mesh datablock name, or None if the cache is off or
+  the mesh has no content hash.
+  """
+  if cache_dir is None or name == unhashed_name: return None
+  return os.path.join(cache_dir, f'mesh{name}.npz')
+
+
+def evict(keep):
+  """
+  Deletes the least recently used cache files until the rest fit in
+  cache_budget, sparing the file keep.
+  """
+  files = []
+  for e in os.scandir(cache_dir):
+    if e.name.startswith('mesh_') and e.name.endswith('.npz'):
+      st = e.stat()
+      files.append((st.st_mtime_ns, st.st_size, e.path))
+
+  total = sum(size for _, size, _ in files)
+  for _, size, path in sorted(files):
+    if total <= cache_budget: break
+    if path == keep: continue
+    try:
+      os.remove(path)
+      total -= size
+    except OSError:
+      pass
+
+
+try:
+  import bpy
+  import numpy as np
+
+  def blend_relative(path): return bpy.path.abspath(path)
+
+  def mesh_arrays(m):
+    """
+    Reads m's geometry as arrays, in the layout from_pydata() writes.
+    """
+    co = np.empty(3 * len(m.vertices), dtype=np.float32)
+    ev = np.empty(2 * len(m.edges),    dtype=np.int32)
+    ls = np.empty(len(m.polygons),     dtype=np.int32)
+    lt = np.empty(len(m.polygons),     dtype=np.int32)
+    lv = np.empty(len(m.loops),        dtype=np.int32)
+    m.vertices.foreach_get('co',           co)
+    m.edges.foreach_get('vertices',        ev)
+    m.polygons.foreach_get('loop_start',   ls)
+    m.polygons.foreach_get('loop_total',   lt)
+    m.loops.foreach_get('vertex_index',    lv)
+    return {'co': co, 'edges': ev, 'loop_start': ls, 'loop_total': lt,
+            'loop_verts': lv}
+
+  def new_mesh(name, a):
+    return fill_mesh(bpy.data.meshes.new(name), a)
+
+  def fill_mesh(m, a):
+    """
+    Writes mesh_arrays() output into the empty mesh m, as from_pydata() would
+    but without going through Python lists.
+    """
+    m.vertices.add(len(a['co']) // 3)
+    m.edges.add(len(a['edges']) // 2)
+    m.loops.add(len(a['loop_verts']))
+    m.polygons.add(len(a['loop_start']))
+    m.vertices.foreach_set('co',          a['co'])
+    m.edges.foreach_set('vertices',       a['edges'])
+    m.polygons.foreach_set('loop_start',  a['loop_start'])
+    try:
+      m.polygons.foreach_set('loop_total', a['loop_total'])
+    except (AttributeError, TypeError):
+      pass    # read-only, and implied by loop_start, in newer Blenders
+    m.loops.foreach_set('vertex_index',   a['loop_verts'])
+    m.update(calc_edges=len(a['loop_start']) > 0)
+    return m
+
+  def load_mesh(name):
+    """
+    Returns a new mesh made from the cache file for name, or None.
+    """
+    path = cache_path(name)
+    if path is None or not os.path.exists(path): return None
+    try:
+      with np.load(path, allow_pickle=False) as f:
+        a = {k: f[k] for k in f.files}
+      m = new_mesh(name, a)
+    except Exception as e:
+      print(f'blendscript: ignoring unreadable mesh cache file {path}: {e}')
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+      return None
+
+    os.utime(path)
+    return m
+
+  def save_mesh(name, m):
+    """
+    Writes m's geometry to the cache file for name, then evicts old files.
+    """
+    path = cache_path(name)
+    if path is None: return m
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+      with open(tmp, 'wb') as fh:
+        np.savez(fh, **mesh_arrays(m))
+      os.replace(tmp, path)
+      evict(path)
+    except OSError as e:
+      print(f'blendscript: couldn\'t write mesh cache file {path}: {e}')
+      try:
+        os.remove(tmp)
+      except OSError:
+        pass
+    return m
+
+except ModuleNotFoundError:
+  blender_not_found()
+
+  def blend_relative(path): return path
@@ -0,0 +1,84 @@
+"""
+Mesh generation in worker processes.
+
+use_parallel_meshes() makes make_bmesh() hand each op list that
+blender/kernel.py can run to the process pool from runtime/parallel.py, so
+independent meshes build on every core while the script keeps evaluating.
+The mesh datablock is created empty straight away, so objects can be linked
+to it; blendscript.run() calls finish_meshes() at the end of the run, which
+waits for the workers and fills each mesh in from shared memory. A mesh
+whose worker fails is generated with bmesh on the main thread instead.
+"""
+
+from concurrent.futures.process import BrokenProcessPool
+
+from ..compatibility import *
+from ..runtime       import parallel
+
+
+parallel_meshes = False
+pending         = []
+
+
+def use_parallel_meshes(on=True):
+  """
+  Turns worker-process mesh generation on or off.
+  """
+  global parallel_meshes
+  parallel_meshes = on
+
+
+try:
+  import bpy
+
+  from .kernel     import attached, describe, generate, release
+  from .mesh_cache import fill_mesh, save_mesh
+
+  def submit_mesh(name, ops, unit, fallback):
+    """
+    Starts generating ops in a worker and returns the empty mesh it will fill,
+    or None if parallel generation is off or can't run ops. fallback(m)
+    renders ops into the mesh m on this thread.
+    """
+    if not parallel_meshes or parallel.pool_workers < 2: return None
+    tree = describe(ops)
+    if tree is None: return None
+    try:
+      f = parallel.process_pool().submit(generate, tree, unit)
+    except (BrokenProcessPool, RuntimeError):
+      parallel.pool = None
+      return None
+    m = bpy.data.meshes.new(name)
+    pending.append((m.name, f, fallback))
+    return m
+
+  def finish_meshes():
+    """
+    Waits for every submitted mesh and fills it in. A mesh stays in pending
+    until it's done, so if this is interrupted, the shared memory of every
+    mesh it didn't finish is still freed.
+    """
+    try:
+      while pending:
+        name, f, fallback = pending[0]
+        m = bpy.data.meshes.get(name)
+        try:
+          with attached(f.result()) as a:
+            if m is not None: fill_mesh(m, a)
+        except Exception as e:
+          if isinstance(e, BrokenProcessPool): parallel.pool = None
+          if m is not None:
+            print(f'blendscript: generating mesh {name} in a worker failed '
+                  f'({e}); generating it here instead')
+            fallback(m)
+        if m is not None: save_mesh(name, m)
+        pending.pop(0)
+    finally:
+      for _, f, _ in pending:
+        if not f.cancel(): f.add_done_callback(release)
+      pending.clear()
+
+except ModuleNotFoundError:
+  blender_not_found()
+
+  def finish_meshes(): pass
@@ -0,0 +1,128 @@
+"""
+Blender meshes from lists of bmesh ops.
+
+The m[] and m< operators in parsers/bmesh.py build op lists out of the vals
+here, and make_bmesh() turns a finished list into a mesh, replaying it against
+a bmesh_and_selection (see blender/bmesh.py).
+"""
+
+from time import time
+
+from ..compatibility import *
+
+from .blender_objects import *
+from .bmesh           import *
+from .gc              import *
+from .mesh_cache      import *
+from .mesh_workers    import *
+from .units           import *
+from ..compiler.types import *
+from ..compiler.val   import *
+from ..runtime.fn     import *
+
+
+try:
+  import bmesh
+  import bpy
+  import mathutils as mu
+
+  def leaf_ops(op):
+    """
+    The ops in the op tree op, in the order apply_bmesh_op() runs them.
+    """
+    if getattr(op, '__iter__', None):
+      for o in op: yield from leaf_ops(o)
+    else:
+      yield op
+
+  def query_refs(q):
+    """
+    The history indexes and binding names that the query q refers to.
+    """
+    if isinstance(q, (int, str)): yield q
+    elif isinstance(q, tuple) and q[0] not in ('B', 'R'):
+      for x in q[1:]: yield from query_refs(x)
+
+  def retention(ops):
+    """
+    Works out which results of the op tree ops are ever referred to, by
+    replaying which ops add history entries. Returns the binding names that
+    queries mention, and a dict from each referenced history index to the step
+    (leaf op number) of its last use; or None if ops contains something other
+    than a mesh op, whose queries we can't see.
+    """
+    names, last, n = set(), {}, 0
+    for step, o in enumerate(leaf_ops(ops)):
+      if not isinstance(o, preloaded_method): return None
+      for x in query_refs(o.kwargs.get('q')):
+        if isinstance(x, str): names.add(x)
+        else:                  last[x if x >= 0 else n + x] = step
+      if o.name in bmesh_and_selection.history_ops: n += 1
+    return names, last
+
+  def apply_bmesh_op(b, op):
+    if getattr(op, '__iter__', None):
+      op = list(op)
+      b.push()
+      for o in op:
+        b = apply_bmesh_op(b, o)
+      return b.pop()
+    else:
+      return op(b).advance()
+
+  def build_bmesh(ops):
+    b = bmesh_and_selection(bmesh.new())
+    r = retention(ops)
+    if r is not None: b.retain(*r)
+    return apply_bmesh_op(b, ops)
+
+  def make_bmesh(ops):
+    """
+    Creates a hash-memoized bmesh object from the specified list of operations.
+    With use_mesh_cache(), meshes are also kept on disk between sessions; see
+    blender/mesh_cache.py. With use_parallel_meshes(), meshes may be generated
+    in worker processes; see blender/mesh_workers.py.
+    """
+    def generate_bmesh(source, name):
+      m = load_mesh(name)
+      if m is not None: return gc_tag(m)
+
+      _, unit, ops = source
+      m = submit_mesh(name, ops, unit,
+                      lambda m: build_bmesh(ops).render_into(m))
+      if m is not None: return gc_tag(m)
+
+      t0 = time()
+      m  = save_mesh(name, build_bmesh(ops).render(name))
+      t1 = time()
+      if t1 - t0 > 0.1: print(f'{int((t1 - t0) * 1000)}ms to render mesh {name}')
+      return gc_tag(m)
+
+    # Meshes are built in scene units, so the unit is part of what we hash
+    return add_hashed(bpy.data.meshes, ('bmesh', unit_scale(1), tuple(ops)),
+                      generate_bmesh)
+
+except ModuleNotFoundError:
+  blender_not_found()
+  def make_bmesh(ops): print(f'make_bmesh({ops})')
+
+
+# NOTE: the type system won't understand this to be a callable type, but in
+# reality these are preloaded method calls, which are Python functions. This
+# prevents the parser from trying to invoke mesh ops on each other in certain
+# cases.
+t_bmesh_op     = atom_type('B/meshop')
+t_bmesh_op_arg = atom_type('B/meshoparg')
+
+t_bmesh_tag   = atom_type('B/meshtag')
+t_bmesh_query = atom_type('B/meshquery')
+
+
+make_bmesh_op_arg = val.of_fn([t_string, t_dynamic], t_bmesh_op_arg,
+                              lambda arg, val: (arg, val))
+
+make_bmesh_op = val.of_fn([t_string, t_list(t_bmesh_op_arg)], t_bmesh_op,
+                          lambda m, kwps: preloaded_method(m, **dict(kwps)))
+
+make_bmesh_fn = val.of_fn([t_list(t_bmesh_op)], t_blendmesh, make_bmesh,
+                          pure=False)
@@ -0,0 +1,155 @@
+"""
+Index bitsets for bmesh selections.
+
+A selection is a boolean mask over each of a mesh's vertex, edge, and face
+tables, so the query algebra (*, +, -) and the F/E/V closures run as whole-
+array operations instead of Python set arithmetic over BMesh elements. Masks
+refer to element indexes, which only mean something for the topology they were
+built against: bmesh_and_selection stores selections as element lists, and
+rebuilds its mesh_tables when a query needs them after an op that changes
+geometry. Ops whose queries are already element lists skip the tables.
+"""
+
+import numpy as np
+
+from functools import reduce
+from operator  import and_, or_
+
+from .spatial import point_index
+
+
+class selection:
+  """
+  Masks over the vertex, edge, and face tables of one mesh_tables.
+  """
+  __slots__ = ('v', 'e', 'f')
+
+  def __init__(self, v, e, f):
+    self.v = v
+    self.e = e
+    self.f = f
+
+  def __and__(self, s): return selection(self.v & s.v, self.e & s.e, self.f & s.f)
+  def __or__(self, s):  return selection(self.v | s.v, self.e | s.e, self.f | s.f)
+  def __sub__(self, s): return selection(self.v & ~s.v, self.e & ~s.e,
+                                         self.f & ~s.f)
+
+  def __repr__(self):
+    return f'selection({self.v.sum()} verts, {self.e.sum()} edges, ' \
+           f'{self.f.sum()} faces)'
+
+
+class mesh_tables:
+  """
+  The incidence structure of a mesh. edge_verts is an (E, 2) array of vertex
+  indexes, and face i's edges are face_edges[face_starts[i]:face_starts[i+1]].
+  elements holds the (verts, edges, faces) lists the indexes refer to.
+  """
+  def __init__(self, elements, edge_verts, face_edges, face_starts):
+    self.elements     = elements
+    self.edge_verts   = edge_verts.reshape(-1, 2)
+    self.n_verts      = len(elements[0])
+    self.n_edges      = len(self.edge_verts)
+    self.n_faces      = len(face_starts) - 1
+    self.face_edges   = face_edges
+    self.face_of_slot = np.repeat(np.arange(self.n_faces), np.diff(face_starts))
+
+  def none(self, v=None, e=None, f=None):
+    """
+    A selection of nothing, except for the masks or index arrays given.
+    """
+    s = selection(np.zeros(self.n_verts, dtype=bool),
+                  np.zeros(self.n_edges, dtype=bool),
+                  np.zeros(self.n_faces, dtype=bool))
+    if v is not None: s.v[v] = True
+    if e is not None: s.e[e] = True
+    if f is not None: s.f[f] = True
+    return s
+
+  def faces(self, s):
+    return self.none(f=s.f)
+
+  def edges(self, s):
+    return self.none(e=s.e | self.none(e=self.face_edges[s.f[self.face_of_slot]]).e)
+
+  def verts(self, s):
+    return self.none(v=s.v | self.none(v=self.edge_verts[self.edges(s).e]).v)
+
+  def touching(self, vs):
+    """
+    Selects every element with a vertex in the mask vs.
+    """
+    e = vs[self.edge_verts].any(axis=1)
+    return self.none(v=vs, e=e, f=self.face_of_slot[e[self.face_edges]])
+
+  def members(self, s):
+    """
+    Returns the elements s selects: vertices, then edges, then faces, each in
+    index order.
+    """
+    vs, es, fs = self.elements
+    return [vs[i] for i in np.flatnonzero(s.v)] \
+         + [es[i] for i in np.flatnonzero(s.e)] \
+         + [fs[i] for i in np.flatnonzero(s.f)]
+
+
+class selection_queries:
+  """
+  Query evaluation shared by bmesh_and_selection and the worker-side
+  array_mesh (blender/kernel.py). Subclasses provide flush(), tables(),
+  coords(), bits(), select_(), and the derived, bindings, and
+  extremum_tolerance attributes.
+  """
+
+  def cached(self, k, build):
+    """
+    Returns build(), computed at most once between geometry changes.
+    """
+    self.flush()
+    x = self.derived.get(k)
+    if x is None: x = self.derived[k] = build()
+    return x
+
+  def vertex_index(self):
+    return self.cached('index', lambda: point_index(self.coords()))
+
+  def resolve_binding(self, b):
+    """
+    Looks up b in self.bindings, preferring inner bindings to outer ones.
+    """
+    for bs in reversed(self.bindings):
+      x = bs.get(b, None)
+      if x is not None: return x
+    raise Exception(
+      f'bmesh: failed to resolve {b} (available bindings are {self.bindings})')
+
+  def query(self, q):
+    """
+    Evaluates q to a selection over tables(). The algebra and closure
+    queries work on bitsets throughout; anything else is selected as
+    elements and converted.
+    """
+    if not isinstance(q, tuple): return self.bits(self.select_(q))
+
+    t = self.tables()
+    c = q[0]
+    if   c == '*': return reduce(and_, map(self.query, q[1:]))
+    elif c == '+': return reduce(or_,  map(self.query, q[1:]))
+    elif c == '-': return self.query(q[1]) - self.query(q[2])
+
+    elif c == 'F': return t.faces(self.query(q[1]))
+    elif c == 'E': return t.edges(self.query(q[1]))
+    elif c == 'V': return t.verts(self.query(q[1]))
+
+    elif c == 'B': return t.none(v=self.vertex_index().box(q[1].co, q[2].co))
+    elif c == 'R': return t.none(v=self.vertex_index().radius(q[1].co,
+                                                            q[2] * self.unit))
+
+    elif c[0] == '^':
+      vs = np.flatnonzero(t.verts(self.query(q[1])).v)
+      if not len(vs): return t.none()
+      xs = self.coords()[vs, 'xyz'.index(c[1].lower())]
+      x  = xs.min() if c[1].islower() else xs.max()
+      return t.none(v=vs[np.abs(xs - x) <= self.extremum_tolerance])
+
+    raise Exception(f'unsupported bmesh query: {q}')
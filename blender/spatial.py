@@ -0,0 +1,105 @@
+"""
+Spatial index over vertex coordinates.
+
+bmesh_and_selection builds one of these the first time a box or radius query
+needs it, from an (N, 3) array of vertex positions, and throws it away
+whenever an op changes the geometry. Building is a couple of NumPy sorts;
+queries look only at the grid cells that overlap the query region, then test
+the points in those cells exactly, so the answers are the same as scanning
+every vertex.
+"""
+
+import numpy as np
+
+
+class point_index:
+  """
+  A uniform grid over points, an (N, 3) array, with about cell_points points
+  per cell. Point indexes are stored sorted by cell (order), and cell c's
+  points are order[starts[c]:starts[c + 1]]; cells are numbered so that each
+  column along z is a contiguous run.
+  """
+  cell_points = 4
+
+  def __init__(self, points):
+    self.points = points
+    n = len(points)
+    if n == 0:
+      self.lo = self.size = np.zeros(3)
+      self.dims  = np.ones(3, dtype=np.int64)
+      self.order = np.zeros(0, dtype=np.int64)
+      self.starts = np.zeros(2, dtype=np.int64)
+      return
+
+    self.lo = points.min(axis=0)
+    extent  = points.max(axis=0) - self.lo
+
+    # Aim for n / cell_points cells, shaped like the bounding box; flat axes
+    # get one cell.
+    cells = max(1.0, n / self.cell_points)
+    live  = extent > 0
+    side  = (np.prod(extent[live]) / cells) ** (1 / live.sum()) if live.any() \
+       else 1.0
+    self.dims = np.where(live, np.clip(np.ceil(extent / side), 1, 1 << 20), 1) \
+                  .astype(np.int64)
+
+    # Very flat or long meshes can ask for far more cells than points; coarsen
+    # the longest axis until they don't.
+    while np.prod(self.dims) > 2 * cells:
+      a = np.argmax(self.dims)
+      self.dims[a] = (self.dims[a] + 1) // 2
+    self.size = np.where(live, extent / self.dims, 1.0)
+
+    c = self.cell_ids(self.cells_of(points))
+    self.order  = np.argsort(c, kind='stable')
+    self.starts = np.searchsorted(c[self.order],
+                                  np.arange(np.prod(self.dims) + 1))
+
+  def cells_of(self, points):
+    return np.clip(((points - self.lo) / self.size).astype(np.int64),
+                   0, self.dims - 1)
+
+  def cell_ids(self, ijk):
+    return (ijk[..., 0] * self.dims[1] + ijk[..., 1]) * self.dims[2] + ijk[..., 2]
+
+  def candidates(self, lo, hi):
+    """
+    Indexes of the points in every cell that overlaps the box [lo, hi].
+    """
+    if np.any(lo > hi) or len(self.points) == 0:
+      return np.zeros(0, dtype=np.int64)
+    (i0, j0, k0), (i1, j1, k1) = self.cells_of(np.array([lo, hi]))
+
+    # A box covering most of the grid is cheaper to answer with one scan.
+    if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.points) // 8 + 1:
+      return np.arange(len(self.points))
+
+    i, j = np.meshgrid(np.arange(i0, i1 + 1), np.arange(j0, j1 + 1),
+                       indexing='ij')
+    first = self.cell_ids(np.stack([i.ravel(), j.ravel(),
+                                    np.full(i.size, k0)], axis=-1))
+    begin = self.starts[first]
+    count = self.starts[first + (k1 - k0 + 1)] - begin
+
+    # The concatenation of the ranges begin[c]:begin[c] + count[c]
+    skip = np.repeat(begin - (np.cumsum(count) - count), count)
+    return self.order[np.arange(count.sum()) + skip]
+
+  def box(self, lo, hi):
+    """
+    Indexes of the points p with lo <= p <= hi, in ascending order.
+    """
+    lo = np.asarray(lo, dtype=np.float64)
+    hi = np.asarray(hi, dtype=np.float64)
+    c  = self.candidates(lo, hi)
+    p  = self.points[c]
+    return np.sort(c[np.all((lo <= p) & (p <= hi), axis=1)])
+
+  def radius(self, center, r):
+    """
+    Indexes of the points within distance r of center, in ascending order.
+    """
+    center = np.asarray(center, dtype=np.float64)
+    c = self.candidates(center - r, center + r)
+    d = self.points[c] - center
+    return np.sort(c[np.einsum('ij,ij->i', d, d) <= r * r])
@@ -4,6 +4,10 @@ Units of measure.
 Blender's Python API always uses meters as its inputs, but the scene may be
 rendered using something else. We need to translate our units into the ones
 used for the scene.
+
+The scene's unit is resolved once per run (see blendscript.run()) rather than
+every time we scale something, and mesh generators fold the factor into their
+inputs as they go; see bmesh_and_selection.
 """
 
 from ..compatibility import *
@@ -21,10 +25,22 @@ unit_conversions = {
 try:
   import bpy
 
+  scene_unit = None
+
+  def resolve_unit_scale():
+    """
+    Reads the scene's length unit and caches its conversion factor for
+    subsequent calls to unit_scale().
+    """
+    global scene_unit
+    scene_unit = unit_conversions[bpy.context.scene.unit_settings.length_unit]
+    return scene_unit
+
   def unit_scale(x):
-    return x * unit_conversions[bpy.context.scene.unit_settings.length_unit]
+    return x * (scene_unit or resolve_unit_scale())
 
 except ModuleNotFoundError:
   blender_not_found()
 
+  def resolve_unit_scale(): return 1
   def unit_scale(x): return x
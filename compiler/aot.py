@@ -0,0 +1,188 @@
+"""
+Ahead-of-time compilation to Python modules.
+
+python -m blendscript compile script.bs -o script_bs.py parses and compiles a
+script once and writes the result as a Python module, so a fresh Blender
+process can run it without going through the parser:
+
+import blendscript, script_bs
+blendscript.live(script_bs)
+
+Compiled code refers to builtins through gensyms like _G28, which are numbered
+in import order and so aren't stable between processes (e.g. Blender registers
+more of them than the offline REPL does). The module instead refers to each
+builtin by its name in runtime/builtins.py, or failing that, by the module
+attribute that holds its val, preferring modules outside parsers/ so that
+loading the module doesn't import the parser. Lifted closures (see
+compiler/lift.py) are emitted as code. portable() and rebuild() use the same
+references to send individual functions to worker processes (see
+runtime/parallel.py).
+
+The code itself is stored as marshalled bytecode rather than Python source,
+because BlendScript nests more deeply than Python's parser allows. This means
+the module only loads on the Python version that wrote it.
+"""
+
+import ast
+import marshal
+import pickle
+import sys
+
+from importlib import import_module
+
+from .lift import lifted_closure
+from .val  import *
+
+
+root_package = __name__.rsplit('.', 2)[0]
+
+
+def global_symbols():
+  """
+  Returns a dict mapping each gensym that can be exported to a stable
+  reference: ('builtin', name) or ('attr', module, name).
+  """
+  from ..runtime.builtins import bindings
+
+  syms = {}
+  for name, v in bindings.items():
+    if isinstance(v, val) and isinstance(v.code, ast.Name):
+      syms.setdefault(v.code.id, ('builtin', name))
+
+  parsers = root_package + '.parsers.'
+  for mname, m in sorted(sys.modules.items(),
+                         key=lambda kv: (kv[0].startswith(parsers), kv[0])):
+    if m is None or not mname.startswith(root_package + '.'): continue
+    for a, v in vars(m).items():
+      if isinstance(v, val) and isinstance(v.code, ast.Name):
+        syms.setdefault(v.code.id, ('attr', mname[len(root_package):], a))
+
+  return syms
+
+
+def resolve(kind, *path):
+  """
+  Returns the global value for a reference produced by global_symbols().
+  """
+  if kind == 'builtin':
+    return import_module('.runtime.builtins', root_package).bindings[path[0]].ref
+  elif kind == 'attr':
+    return getattr(import_module(path[0], root_package), path[1]).ref
+  raise Exception(f'blendscript.aot: unknown reference kind {kind}')
+
+
+def check_version(v):
+  if tuple(sys.version_info[:2]) != tuple(v): raise ImportError(
+    f'this BlendScript module was compiled for Python {v[0]}.{v[1]}; '
+    'recompile it with python -m blendscript compile')
+
+
+def expression_bytecode(code, filename):
+  e = ast.Expression(code)
+  ast.fix_missing_locations(e)
+  return compile(e, filename, 'eval')
+
+
+def dependencies(main, filename):
+  """
+  Returns (builtin, lifted) for the globals that the code object main refers
+  to, directly or through lifted closures: builtin maps gensyms to references
+  for resolve(), and lifted maps gensyms to code objects, each compiled under
+  the filename it was lifted from. Lifted closures come after the ones they
+  refer to.
+  """
+  syms    = global_symbols()
+  lifted  = {}
+  builtin = {}
+
+  def visit(c):
+    for gs in code_globals(c) & val.bound_globals.keys():
+      if gs in builtin or gs in lifted: continue
+      l = lifted_closure(gs)
+      if l is not None:
+        b = expression_bytecode(l[1], l[0])
+        visit(b)
+        lifted[gs] = b
+      elif gs in syms:
+        builtin[gs] = syms[gs]
+      else: raise Exception(
+        f'blendscript.aot: cannot export {gs} = {val.bound_globals[gs]!r}')
+
+  visit(main)
+  return builtin, lifted
+
+
+def portable(f, filename=None):
+  """
+  Returns a picklable description of the function f that rebuild() can turn
+  back into f in another process, or None if that isn't possible. Only pure
+  builtins and closures that were lifted to globals (see compiler/lift.py)
+  qualify, since anything else can refer to locals we can't see. The code is
+  compiled under filename, which defaults to the file f was lifted from.
+  """
+  gs = next((g for g, v in val.bound_globals.items() if v is f), None)
+  if gs is None: return None
+  if filename is None: filename = (lifted_closure(gs) or ('blendscript',))[0]
+
+  try:
+    builtin, lifted = dependencies(
+      expression_bytecode(ast.Name(id=gs, ctx=ast.Load()), filename), filename)
+  except Exception:
+    return None
+  if val.impure_globals & builtin.keys(): return None
+
+  return (gs,
+          tuple(sorted(builtin.items())),
+          tuple((g, marshal.dumps(c)) for g, c in lifted.items()))
+
+
+def rebuild(desc):
+  """
+  Returns the function described by portable().
+  """
+  gs, builtin, lifted = desc
+  env = {g: resolve(*ref) for g, ref in builtin}
+  for g, c in lifted: env[g] = eval(marshal.loads(c), env)
+  return env[gs]
+
+
+def module_source(v, filename):
+  """
+  Returns Python source for a module that evaluates the compiled val v.
+  Tracebacks will refer to lines of filename.
+  """
+  main            = v.bytecode(filename)
+  builtin, lifted = dependencies(main, filename)
+
+  lines = [
+    '"""',
+    f'BlendScript compiled from {filename}',
+    '',
+    'Generated by python -m blendscript compile; edit the source and recompile',
+    'rather than changing this file.',
+    '"""',
+    '',
+    'import marshal',
+    'import pickle',
+    '',
+    f'from {root_package}.compiler.aot import check_version, resolve',
+    '',
+    f'check_version({tuple(sys.version_info[:2])!r})',
+    '']
+
+  for gs, ref in sorted(builtin.items()):
+    lines.append(f'{gs} = resolve{ref!r}')
+
+  # dependencies() lists lifted closures after the ones they refer to
+  for gs, c in lifted.items():
+    lines.append(f'{gs} = eval(marshal.loads({marshal.dumps(c)!r}))')
+
+  lines += [
+    '',
+    f't    = pickle.loads({pickle.dumps(v.t)!r})',
+    f'main = eval(marshal.loads({marshal.dumps(main)!r}))',
+    '',
+    'compiled = (t, main)',
+    '']
+
+  return '\n'.join(lines)
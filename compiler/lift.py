@@ -0,0 +1,282 @@
+"""
+Lambda lifting and invariant hoisting.
+
+val.fn() compiles to fn(lambda x: body) inline, so a lambda that appears inside
+another lambda (or inside anything that runs more than once) rebuilds both the
+Python lambda and its fn() wrapper every time its enclosing expression is
+evaluated. Worse, anything in the body that doesn't depend on x is recomputed
+for every element when the function is used with *, %, or /.
+
+This pass runs over the finished AST just before val.compile() hands it to
+Python. It does two things, bottom-up:
+
+1. Hoists maximal pure, x-invariant subexpressions out of each fn() lambda
+   body, binding them once per lambda creation:
+   (lambda _H0: fn(lambda x: ... _H0() ...))(lazy(lambda: invariant))
+
+   lazy() evaluates the invariant the first time the lambda needs it, so an
+   invariant that's never reached, or that raises, behaves as it did before
+   it was hoisted. It also materializes one-shot iterators like the result of
+   f * xs, since the hoisted value is now shared between calls.
+
+2. Lifts fn() lambdas that are closed -- i.e. refer only to bound globals -- to
+   global constants, so they're created once at compile time and never again.
+   Lifted closures are compiled under the script's filename, so tracebacks
+   and profiles credit lambda bodies to their source, and they're cached per
+   file by structure and position, so recompiling an unchanged script reuses
+   them; see lift_cache.
+
+Purity is conservative: Blender-facing builtins are registered as impure with
+val.of(..., pure=False), anything that isn't code BlendScript generates itself
+(e.g. {...} Python snippets) is impure, and so is any local bound to an impure
+value. Lambda parameters are impure too, since they can hold any function,
+including an impure builtin, and a call like (f 0) in the body of a lambda
+mapped over xs has to run once per element. A lifted closure is impure if its
+body is. We never hoist out of the branches of a ternary, since those might
+not be evaluated at all.
+"""
+
+import ast
+
+from collections import OrderedDict
+from copy        import copy
+
+from ..runtime.fn import lazy
+from .val         import *
+
+
+# AST nodes that BlendScript itself generates. Anything else came from a Python
+# snippet and could do whatever it wants.
+generated_nodes = (ast.Expression, ast.Constant, ast.Name, ast.Call,
+                   ast.Lambda, ast.IfExp, ast.Tuple, ast.List, ast.UnaryOp,
+                   ast.arguments, ast.arg, ast.expr_context, ast.unaryop)
+
+
+v_lazy = val.of(t_dynamic, lazy)
+
+lift_cache_size = 4096
+
+
+def map_children(node, f):
+  """
+  Returns node with f applied to each child node. The original node is left
+  alone; if any child changes, we return a shallow copy. (vals share code
+  objects, so we can't modify anything in place.)
+  """
+  changes = {}
+  for k, x in ast.iter_fields(node):
+    if isinstance(x, ast.AST):
+      y = f(x)
+      if y is not x: changes[k] = y
+    elif isinstance(x, list):
+      ys = [f(e) if isinstance(e, ast.AST) else e for e in x]
+      if any(y is not e for y, e in zip(ys, x)): changes[k] = ys
+
+  if not changes: return node
+  node = copy(node)
+  for k, y in changes.items(): setattr(node, k, y)
+  return node
+
+
+def lambda_params(l):
+  return {a.arg for a in l.args.args}
+
+
+class lift_cache:
+  """
+  The closures lifted from one file. gensyms maps each closure's structure to
+  the global it was lifted to, most recently used last, and code maps those
+  globals back to the AST they were compiled from, for compiler/aot.py.
+
+  After each pass, trim() drops the least recently used closures past
+  lift_cache_size and unbinds their globals, sparing any the pass used. Code
+  that was already compiled keeps working, since it's evaluated in its own
+  val.environment().
+  """
+  def __init__(self, filename):
+    self.filename = filename
+    self.gensyms  = OrderedDict()
+    self.code     = {}
+
+  def get(self, k):
+    gs = self.gensyms.get(k)
+    if gs is not None: self.gensyms.move_to_end(k)
+    return gs
+
+  def add(self, k, gs, code):
+    self.gensyms[k] = gs
+    self.code[gs]   = code
+
+  def trim(self, used):
+    while len(self.gensyms) > lift_cache_size:
+      k, old = next(iter(self.gensyms.items()))
+      if old in used: break
+      del self.gensyms[k], self.code[old]
+      val.unbind(old)
+
+
+def lifted_closure(gs):
+  """
+  Returns (filename, code) for the global gs if it's a lifted closure, or None.
+  """
+  for c in closure_lifter.caches.values():
+    if gs in c.code: return c.filename, c.code[gs]
+  return None
+
+
+class closure_lifter:
+  """
+  A single lifting pass over code from filename. Free-variable and purity
+  information is memoized per node for the lifetime of the pass, which is fine
+  because we never modify nodes once they're built.
+  """
+  caches = {}
+
+  def __init__(self, fn_name, bound_globals, impure_globals,
+               filename='blendscript'):
+    self.fn_name        = fn_name
+    self.bound_globals  = bound_globals
+    self.impure_globals = impure_globals
+    self.filename       = filename
+    self.used           = set()
+    self.free_memo      = {}
+    self.foreign_memo   = {}
+    self.hoist_id       = 0
+
+  def free_names(self, node):
+    k = id(node)
+    if k not in self.free_memo:
+      if isinstance(node, ast.Name):
+        r = frozenset([node.id])
+      elif isinstance(node, ast.Lambda):
+        r = self.free_names(node.body) - lambda_params(node)
+      else:
+        r = frozenset().union(*map(self.free_names,
+                                   ast.iter_child_nodes(node)))
+      self.free_memo[k] = (node, r)
+    return self.free_memo[k][1]
+
+  def foreign(self, node):
+    k = id(node)
+    if k not in self.foreign_memo:
+      r = not isinstance(node, generated_nodes) \
+          or any(map(self.foreign, ast.iter_child_nodes(node)))
+      self.foreign_memo[k] = (node, r)
+    return self.foreign_memo[k][1]
+
+  def pure(self, node, impure):
+    return not self.foreign(node) \
+       and not (self.free_names(node) & (impure | self.impure_globals))
+
+  def is_fn_lambda(self, node):
+    return isinstance(node, ast.Call) \
+       and isinstance(node.func, ast.Name) and node.func.id == self.fn_name \
+       and len(node.args) == 1 and isinstance(node.args[0], ast.Lambda)
+
+  def __call__(self, node, impure=frozenset()):
+    if self.is_fn_lambda(node):
+      l    = node.args[0]
+      body = self(l.body, impure | lambda_params(l))
+      return ast.copy_location(self.lift(l.args, body, impure), node)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Lambda):
+      # A let-binding from val.bind_vars(): locals inherit the purity of the
+      # values they're bound to.
+      xs   = [self(x, impure) for x in node.args]
+      ps   = [a.arg for a in node.func.args.args]
+      bad  = {p for p, x in zip(ps, xs) if not self.pure(x, impure)}
+      body = self(node.func.body, impure | bad)
+      if body is node.func.body and all(x is y for x, y in zip(xs, node.args)):
+        return node
+      f = copy(node.func)
+      f.body = body
+      node = copy(node)
+      node.func, node.args = f, xs
+      return node
+
+    return map_children(node, lambda x: self(x, impure))
+
+  def hoist(self, node, bound, impure, hoisted):
+    """
+    Replaces maximal pure subexpressions of node that don't refer to anything
+    in bound with calls to lazy values, appending (name, expr) pairs to
+    hoisted.
+    """
+    if isinstance(node, (ast.Call, ast.IfExp)) \
+       and not (self.free_names(node) & bound) \
+       and self.pure(node, impure):
+      name = f'_H{self.hoist_id}'
+      self.hoist_id += 1
+      hoisted.append((name, node))
+      return call(ast.Name(id=name, ctx=ast.Load()), [])
+
+    if isinstance(node, ast.IfExp):
+      t = self.hoist(node.test, bound, impure, hoisted)
+      if t is node.test: return node
+      node = copy(node)
+      node.test = t
+      return node
+
+    if isinstance(node, ast.Lambda):
+      b = self.hoist(node.body, bound | lambda_params(node), impure, hoisted)
+      if b is node.body: return node
+      node = copy(node)
+      node.body = b
+      return node
+
+    return map_children(node, lambda x: self.hoist(x, bound, impure, hoisted))
+
+  def lift(self, args, body, impure):
+    """
+    Rebuilds fn(lambda args: body), hoisting invariants out of body and
+    lifting the result into a global if it's closed.
+    """
+    hoisted = []
+    body = self.hoist(body, frozenset(a.arg for a in args.args), impure,
+                      hoisted)
+
+    r = call(ast.Name(id=self.fn_name, ctx=ast.Load()),
+             [ast.Lambda(args=args, body=body)])
+    if hoisted:
+      r = call(ast.Lambda(args=arglist([n for n, _ in hoisted]), body=r),
+               [ast.copy_location(
+                  call(v_lazy.code, [ast.Lambda(args=arglist([]), body=x)]), x)
+                for _, x in hoisted])
+
+    if not self.free_names(r) <= self.bound_globals.keys(): return r
+
+    # Positions are part of the key, so a closure that moves in the source
+    # is recompiled with its new line numbers
+    cache = closure_lifter.caches.get(self.filename)
+    if cache is None:
+      cache = closure_lifter.caches[self.filename] = lift_cache(self.filename)
+    k  = ast.dump(r, include_attributes=True)
+    gs = cache.get(k)
+    if gs is None:
+      try:
+        e = ast.Expression(r)
+        ast.fix_missing_locations(e)
+        c = compile(e, self.filename, 'eval')
+        v = eval(c, val.environment(c))
+      except Exception:
+        # Leave it to fail at runtime, if it's ever actually called
+        return r
+      gs = val.of(t_dynamic, v, pure=self.pure(r, impure)).code.id
+      cache.add(k, gs, r)
+
+    self.used.add(gs)
+    return ast.Name(id=gs, ctx=ast.Load())
+
+
+def lift_closures(code, filename='blendscript'):
+  """
+  Returns a copy of code with closed fn() lambdas lifted to globals and
+  invariant subexpressions hoisted out of lambda bodies. code came from
+  filename.
+  """
+  lifter = closure_lifter(fn_val.code.id, val.bound_globals,
+                          val.impure_globals, filename)
+  code   = lifter(code)
+  cache  = closure_lifter.caches.get(filename)
+  if cache is not None: cache.trim(lifter.used)
+  return code
@@ -0,0 +1,129 @@
+"""
+Cross-run memoization of pure subexpressions.
+
+live() recompiles and reruns the whole script after every edit, so values like
+L * f i 1000 or a chain of matrix products are recomputed even though nothing
+they depend on has changed. blendscript.compile(source, memoize=True) runs
+this pass after compiler/lift.py: every maximal subexpression that's pure and
+closed (it refers only to bound globals, not to lambda parameters or let
+locals) is wrapped so its result is kept in a process-wide cache:
+
+_Gmemo(b'<structural hash>', lambda: expr)
+
+The key hashes the expression's AST, which is stable between runs because
+gensyms, lifted closures, and literals are. Purity is the same conservative
+test the lifting pass uses, so anything that reaches bpy, creates objects, or
+comes from a {...} Python snippet is never cached. We don't look inside fn()
+lambda bodies; those run per element, and their invariants have already been
+hoisted out.
+
+The cache is LRU with a memory budget in (approximate) bytes.
+"""
+
+import ast
+import sys
+
+from collections import OrderedDict
+from copy        import copy
+from hashlib     import blake2b
+
+from ..runtime.arrays import packed_array
+from ..runtime.fn     import reusable
+from .lift            import closure_lifter, map_children
+from .val             import *
+
+
+def approx_size(x, depth=2):
+  """
+  Estimates the memory held by x, looking a couple of levels into containers.
+  """
+  n = sys.getsizeof(x)
+  if isinstance(x, packed_array): return n + x.data.nbytes
+  if depth and isinstance(x, (tuple, list)):
+    n += sum(approx_size(y, depth - 1) for y in x)
+  return n
+
+
+class result_cache:
+  """
+  An LRU map from structural hashes to evaluated results. Results larger than
+  the whole budget are returned but not kept.
+  """
+  def __init__(self, budget=256 << 20):
+    self.budget  = budget
+    self.entries = OrderedDict()
+    self.size    = 0
+    self.hits    = 0
+    self.misses  = 0
+
+  def __call__(self, k, f):
+    e = self.entries.get(k)
+    if e is not None:
+      self.entries.move_to_end(k)
+      self.hits += 1
+      return e[0]
+
+    self.misses += 1
+    v = reusable(f())
+    self.store(k, v)
+    return v
+
+  def store(self, k, v):
+    n = approx_size(v)
+    if n > self.budget: return
+    self.entries[k] = (v, n)
+    self.size += n
+    while self.size > self.budget:
+      _, (_, m) = self.entries.popitem(last=False)
+      self.size -= m
+
+  def clear(self):
+    self.entries.clear()
+    self.size = 0
+
+  def __repr__(self):
+    return f'result_cache({len(self.entries)} entries, {self.size} bytes, ' \
+           f'{self.hits} hits, {self.misses} misses)'
+
+
+memo   = result_cache()
+v_memo = val.of(t_dynamic, memo)
+
+
+class memoizer(closure_lifter):
+  """
+  Finds maximal closed pure subexpressions and routes them through the result
+  cache. Let-binding bodies are searched, since they run once per evaluation
+  of the let; fn() lambda bodies aren't.
+  """
+  def __call__(self, node):
+    if isinstance(node, (ast.Call, ast.IfExp)) \
+       and self.free_names(node) <= self.bound_globals.keys() \
+       and self.pure(node, frozenset()):
+      k = blake2b(ast.dump(node).encode(), digest_size=16).digest()
+      return ast.copy_location(
+        call(v_memo.code, [ast.Constant(k),
+                           ast.Lambda(args=arglist([]), body=node)]),
+        node)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Lambda):
+      body = self(node.func.body)
+      xs   = [self(x) for x in node.args]
+      if body is node.func.body and all(x is y for x, y in zip(xs, node.args)):
+        return node
+      f = copy(node.func)
+      f.body = body
+      node = copy(node)
+      node.func, node.args = f, xs
+      return node
+
+    if isinstance(node, ast.Lambda): return node
+    return map_children(node, self)
+
+
+def memoize_pure(code):
+  """
+  Returns a copy of code whose closed pure subexpressions are memoized across
+  runs.
+  """
+  return memoizer(fn_val.code.id, val.bound_globals, val.impure_globals)(code)
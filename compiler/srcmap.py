@@ -0,0 +1,162 @@
+"""
+Source maps from BlendScript source to compiled Python.
+
+The parser records the byte span of each application, lambda, list, and let
+expression it builds as a .span attribute on the AST node (see
+parsers/basic.py). Before compiling, locate() copies the tree with those spans
+turned into Python line and column numbers, so tracebacks and profilers point
+at the BlendScript source instead of line 1 of a file called "blendscript". It
+also returns a source map from Python positions back to source byte ranges.
+
+span_profiler uses the source map to attribute time to the BlendScript
+expression each call was made from; blendscript.compile(source, profile=True)
+uses it to report where a script spends its time.
+"""
+
+import ast
+import linecache
+import sys
+
+from bisect import bisect_right
+from copy   import copy
+from time   import perf_counter
+
+from .lift import map_children
+
+
+def line_starts(source):
+  """
+  Returns the byte offset at which each line of source begins.
+  """
+  starts = [0]
+  i = source.find(b'\n')
+  while i >= 0:
+    starts.append(i + 1)
+    i = source.find(b'\n', i + 1)
+  return starts
+
+
+def locate(code, source):
+  """
+  Returns (code, smap): a copy of code in which every node with a parse span
+  has Python source positions, and a dict that maps (lineno, col, end_lineno,
+  end_col) to the (start, end) byte range it came from. Python columns are
+  UTF-8 byte offsets, which is what the parser gives us.
+
+  Nodes are copied rather than modified, since vals share them with other
+  expressions, modules, and compiler/lift.py's cache of lifted closures; the
+  copy shares every subtree that has no spans in it.
+  """
+  starts = line_starts(source)
+  smap   = {}
+  done   = {}
+
+  def position(i):
+    l = bisect_right(starts, i)
+    return l, i - starts[l - 1]
+
+  # Post-order, without recursion: BlendScript nests deeper than Python's
+  # stack
+  stack = [(code, False)]
+  while stack:
+    node, ready = stack.pop()
+    if id(node) in done: continue
+    if not ready:
+      stack.append((node, True))
+      stack.extend((c, False) for c in ast.iter_child_nodes(node))
+      continue
+
+    r    = map_children(node, lambda c: done[id(c)])
+    span = getattr(node, 'span', None)
+    if span is not None and 'lineno' in node._attributes:
+      if r is node: r = copy(node)
+      r.lineno,     r.col_offset     = position(span[0])
+      r.end_lineno, r.end_col_offset = position(span[1])
+      smap[(r.lineno, r.col_offset, r.end_lineno, r.end_col_offset)] = span
+    done[id(node)] = r
+
+  return done[id(code)], smap
+
+
+def register_source(filename, source):
+  """
+  Makes source visible to linecache, which is where tracebacks and profilers
+  get source lines from.
+  """
+  text  = source.decode(errors='replace')
+  lines = text.splitlines(True)
+  linecache.cache[filename] = (len(text), None, lines, filename)
+
+
+class span_profiler:
+  """
+  A sys.setprofile() hook that attributes inclusive wall time to the source
+  span of each call made from compiled BlendScript code. Time spent in a span
+  is counted once even if it recurses into itself.
+
+  Call positions come from code.co_positions(), which needs Python 3.11; on
+  older versions we fall back to line numbers.
+  """
+  def __init__(self, filename, source, source_map):
+    self.filename  = filename
+    self.source    = source
+    self.spans     = source_map
+    self.positions = {}
+    self.stack     = []
+    self.active    = {}
+    self.times     = {}
+    self.calls     = {}
+
+  def span_of(self, frame):
+    if frame is None or frame.f_code.co_filename != self.filename: return None
+    c = frame.f_code
+    if not hasattr(c, 'co_positions'): return (frame.f_lineno,)
+
+    if c not in self.positions: self.positions[c] = list(c.co_positions())
+    ps = self.positions[c]
+    i  = frame.f_lasti // 2
+    if i >= len(ps) or ps[i][0] is None: return (frame.f_lineno,)
+    l, el, col, ecol = ps[i]
+    return (l, col, el, ecol)
+
+  def __call__(self, frame, event, arg):
+    if event == 'call' or event == 'c_call':
+      k = self.span_of(frame.f_back if event == 'call' else frame)
+      if k is not None:
+        self.active[k] = self.active.get(k, 0) + 1
+        self.calls[k]  = self.calls.get(k, 0) + 1
+      self.stack.append((k, perf_counter()))
+
+    elif event in ('return', 'c_return', 'c_exception') and self.stack:
+      k, t0 = self.stack.pop()
+      if k is not None:
+        self.active[k] -= 1
+        if not self.active[k]:
+          self.times[k] = self.times.get(k, 0) + perf_counter() - t0
+
+  def run(self, f, *xs):
+    sys.setprofile(self)
+    try:
+      return f(*xs)
+    finally:
+      sys.setprofile(None)
+
+  def describe(self, k):
+    if len(k) == 1: return f'line {k[0]}', ''
+    span = self.spans.get(k)
+    text = '' if span is None else \
+           self.source[span[0]:span[1]].decode(errors='replace')
+    text = ' '.join(text.split())
+    if len(text) > 60: text = text[:57] + '...'
+    return f'{k[0]}:{k[1]}', text
+
+  def report(self, n=20, file=None):
+    """
+    Prints the n spans with the most inclusive time.
+    """
+    print(f'blendscript profile: {self.filename}', file=file)
+    top = sorted(self.times.items(), key=lambda kv: -kv[1])[:n]
+    for k, t in top:
+      where, text = self.describe(k)
+      print(f'{t * 1000:10.1f}ms {self.calls[k]:8d}x  {where:>10}  {text}',
+            file=file)
@@ -17,7 +17,14 @@ from inspect import signature
 class blendscript_type:
   """
   An abstract base class that all blendscript types extend from.
+
+  Types are immutable and hash-consed: constructing the same type twice gives
+  you the same object back, so equality is an identity check. The parser
+  creates and compares a lot of these. Each type pickles as a call to its
+  constructor, so unpickling keeps that true.
   """
+  __slots__ = ()
+
   def arg_type(self):    return None
   def return_type(self): return None
   def value_arity(self): return 0
@@ -27,15 +34,40 @@ class blendscript_type:
     # TODO: HM stuff
     pass
 
+  def __setattr__(self, k, v):
+    raise AttributeError(f'cannot modify type {self}')
+
 
 def isatype(x): return isinstance(x, blendscript_type)
 
 
+def interned(cls, k, **fields):
+  """
+  Returns the canonical instance of cls for key k, creating it with the
+  specified fields if it doesn't exist yet.
+  """
+  t = cls.instances.get(k)
+  if t is None:
+    t = object.__new__(cls)
+    for f, v in fields.items(): object.__setattr__(t, f, v)
+    cls.instances[k] = t
+  return t
+
+
 class atom_type(str, blendscript_type):
   """
   A single concrete type whose kind is *. Values of this type are not callable;
   if you need a callable value, use fn_type.
   """
+  __slots__ = ()
+  instances = {}
+
+  def __new__(cls, name):
+    t = cls.instances.get(name)
+    if t is None: t = cls.instances[name] = str.__new__(cls, name)
+    return t
+
+  def __reduce__(self): return atom_type, (str(self),)
 
 
 class dynamic_type(blendscript_type):
@@ -43,6 +75,12 @@ class dynamic_type(blendscript_type):
   A type that satisfies every type constraint. If addressed as a function, its
   arity is unbounded -- represented by -1.
   """
+  __slots__ = ()
+  instances = {}
+
+  def __new__(cls): return interned(cls, None)
+  def __reduce__(self): return dynamic_type, ()
+
   def value_arity(self):   return -1
   def arg_type(self):      return t_dynamic
   def return_type(self):   return t_dynamic
@@ -53,38 +91,41 @@ class unary_type(blendscript_type):
   """
   A type whose kind is (* -> *), applied to a single type argument.
   """
-  def __init__(self, name, a):
-    self.name = name
-    self.a    = a
+  __slots__ = ('name', 'a')
+  instances = {}
+
+  def __new__(cls, name, a):
+    return interned(cls, (name, a), name=name, a=a)
+
+  def __reduce__(self): return unary_type, (self.name, self.a)
 
   def instantiate(self):
     return unary_type(self.name, self.a.instantiate())
 
   def __str__(self): return f'({self.name} {self.a})'
-  def __hash__(self): return hash((self.name, self.a))
-  def __eq__(self, t):
-    return isinstance(t, unary_type) and (self.name, self.a) == (t.name, t.a)
 
 
 class fn_type(blendscript_type):
   """
   A function whose argument and return types are specified.
   """
-  def __init__(self, a, r):
-    self.a = a
-    self.r = r
+  __slots__ = ('a', 'r', 'arity')
+  instances = {}
+
+  def __new__(cls, a, r):
+    return interned(cls, (a, r), a=a, r=r,
+                    arity=1 + max(0, (a if r is t_same else r).value_arity()))
+
+  def __reduce__(self): return fn_type, (self.a, self.r)
 
   def instantiate(self):
     return fn_type(self.a.instantiate(), self.r.instantiate())
 
-  def value_arity(self): return 1 + max(0, self.r.value_arity())
+  def value_arity(self): return self.arity
   def arg_type(self):    return self.a
   def return_type(self): return self.r
 
   def __str__(self): return f'({self.a} -> {self.r})'
-  def __hash__(self): return hash((self.a, self.r))
-  def __eq__(self, t):
-    return isinstance(t, fn_type) and (self.a, self.r) == (t.a, r.r)
 
 
 def with_typevars(f):
@@ -115,3 +156,9 @@ t_number = atom_type('N')
 t_string = atom_type('S')
 t_int    = atom_type('I')
 t_bool   = atom_type('B')
+
+# The return type of a function whose result has its argument's type, like
+# memo n f. val.__call__ substitutes the argument's type, and fn_type takes its
+# arity from the argument; this stands in for a typevar until unification does
+# it for us.
+t_same = atom_type('=')
@@ -13,10 +13,12 @@ generate parse trees, then feed those to compile().
 
 import ast
 
-from functools import partial, reduce
+from functools import reduce
+from weakref   import WeakValueDictionary
 
-from ..runtime.fn import fn
-from .types       import *
+from ..runtime.arrays import unpack_array
+from ..runtime.fn     import curried, fn
+from .types           import *
 
 
 def sanitize_identifier(s):
@@ -46,14 +48,33 @@ def call(f, xs):
   return ast.Call(f, xs, keywords=[])
 
 
+def code_globals(c):
+  """
+  Returns the set of global names referred to by a code object and everything
+  nested inside it.
+  """
+  names = set(c.co_names)
+  for x in c.co_consts:
+    if hasattr(x, 'co_names'): names |= code_globals(x)
+  return names
+
+
 class val:
   """
   A BlendScript value produced by the specified code and having type t. code
   can be either a string or a sequence of stringable things that will later be
   concatenated.
+
+  vals are slotted and immutable; the parser creates lots of them, many of
+  which are discarded by backtracking. Literals are interned for as long as
+  something refers to them.
   """
+  __slots__ = ('t', 'code', 'ref', '__weakref__')
+
   bound_globals = {}
   global_vals = {}
+  impure_globals = set()
+  lit_vals = WeakValueDictionary()
   gensym_id = 0
 
   def __init__(self, t, code, ref=None):
@@ -68,9 +89,12 @@ class val:
     if not isatype(t):
       raise Exception(f'instantiating val with invalid type: {t}')
 
-    self.t    = t
-    self.code = code
-    self.ref  = ref
+    object.__setattr__(self, 't',    t)
+    object.__setattr__(self, 'code', code)
+    object.__setattr__(self, 'ref',  ref)
+
+  def __setattr__(self, k, v):
+    raise AttributeError(f'cannot modify val {self!r}')
 
   def __str__(self): return ast.dump(self.code)
 
@@ -78,22 +102,40 @@ class val:
     typestr = '' if self.t == t_dynamic else f' :: {str(self.t)}'
     return f'{str(self) if self.ref is None else repr(self.ref)}{typestr}'
 
-  def compile(self):
+  def compile(self, filename='blendscript', memoize=False):
     """
     Compiles this value into a nullary lambda that will return the result when
     invoked.
     """
-    e = ast.Expression(ast.Lambda(args=arglist([]), body=self.code))
+    c = self.bytecode(filename, memoize)
+    return eval(c, val.environment(c))
+
+  def bytecode(self, filename='blendscript', memoize=False):
+    """
+    Returns the Python code object for compile(): an expression that evaluates
+    to the nullary lambda. Closed lambdas are lifted and loop invariants
+    hoisted first; see compiler/lift.py. If memoize is true, pure closed
+    subexpressions are cached between runs; see compiler/memo.py. Nodes that
+    have been given source positions (see compiler/srcmap.py) keep them.
+    """
+    from .lift import lift_closures
+    code = lift_closures(self.code, filename)
+    if memoize:
+      from .memo import memoize_pure
+      code = memoize_pure(code)
+    e = ast.Expression(ast.Lambda(args=arglist([]), body=code))
     ast.fix_missing_locations(e)
-    c = compile(e, 'blendscript', 'eval')
-    return eval(c, val.bound_globals)
+    return compile(e, filename, 'eval')
 
   @classmethod
-  def of(cls, t, v):
+  def of(cls, t, v, pure=True):
     """
     Binds a global value and produces a val that refers to it. Note that this
     global value lives forever, so don't go binding tons of these. If possible,
     you should use val.lit() instead to drop a literal string into the code.
+
+    Set pure=False for functions with side effects (e.g. anything that creates
+    Blender objects); the compiler won't move or share calls to them.
     """
     if v in cls.global_vals: return cls.global_vals[v]
 
@@ -104,8 +146,31 @@ class val:
     cls.gensym_id += 1
     cls.bound_globals[gs] = v
     cls.global_vals[v] = r
+    if not pure: cls.impure_globals.add(gs)
     return r
 
+  @classmethod
+  def environment(cls, c):
+    """
+    Returns the bound globals that the code object c refers to, as a new dict
+    to evaluate it in. Gensyms are never rebound, so code evaluated this way
+    keeps working after unbind() drops its globals from bound_globals.
+    """
+    return {k: cls.bound_globals[k] for k in code_globals(c)
+            if k in cls.bound_globals}
+
+  @classmethod
+  def unbind(cls, gs):
+    """
+    Forgets the global gs bound by val.of(), so caches of generated globals can
+    let go of them. Code that's already been evaluated keeps its own
+    environment(); only new code can no longer refer to gs.
+    """
+    v = cls.bound_globals.pop(gs)
+    r = cls.global_vals.get(v)
+    if r is not None and r.code.id == gs: del cls.global_vals[v]
+    cls.impure_globals.discard(gs)
+
   @classmethod
   def lit(cls, t, v):
     """
@@ -114,12 +179,16 @@ class val:
     works because the value is serialized into the compiled output, not
     referenced via the global gensym table.)
     """
+    s = repr(v)
+    r = cls.lit_vals.get((t, s))
+    if r is not None: return r
     try:
-      r = ast.parse(repr(v)).body[0].value
-      return cls(t, r, ref=v)
+      r = cls(t, ast.parse(s).body[0].value, ref=v)
     except:
       raise Exception(
         f'{repr(v)} is not sufficiently serializable to use with val.lit()')
+    cls.lit_vals[(t, s)] = r
+    return r
 
   @classmethod
   def var_ref(cls, t, name):
@@ -152,25 +221,21 @@ class val:
   def float(cls, n): return cls.lit(t_number, float(n))
 
   @classmethod
-  def of_fn(cls, ats, rt, f):
+  def of_fn(cls, ats, rt, f, pure=True, vectorized=None):
     """
     Converts a unary Python function with the specified argument types into a
     BlendScript function. If multiple arguments are specified, the type will be
     appropriately recursive and the function you provide will automatically be
-    curried.
-    """
-    n_args = len(ats)
-    def g(*xs):
-      if len(xs) == n_args:
-        return f(*xs)
-      else:
-        return fn(partial(g, *xs), source=f'{f}({", ".join(map(str, xs))}, ...)')
+    curried. pure is passed through to val.of().
 
+    vectorized is an optional NumPy version of f that takes the same
+    arguments; see runtime/vectorize.py.
+    """
     t = rt
     for a in reversed(ats):
       t = t_fn(a, t)
 
-    return cls.of(t, fn(g, source=str(t)))
+    return cls.of(t, curried(f, len(ats), (), str(t), vectorized), pure=pure)
 
   @classmethod
   def fn(cls, at, argname, body):
@@ -197,6 +262,19 @@ class val:
     return cls(t_list(t or typevar()),
                ast.Tuple(elts=[x.code for x in xs], ctx=ast.Load()))
 
+  @classmethod
+  def packed(cls, t, a):
+    """
+    Returns a val for a homogeneous list of numbers of type t, given as an
+    array.array. Rather than one AST node per element, this compiles to a
+    single bytes constant that's viewed in place at runtime (see
+    runtime/arrays.py).
+    """
+    return cls(t_list(t),
+               call(packed_val.code, [ast.Constant(a.tobytes()),
+                                      ast.Constant(a.typecode)]),
+               ref=a)
+
   def typed(self, t):
     """
     Returns a new val that holds the same quantity, but which has a different
@@ -214,7 +292,7 @@ class val:
     if r is None: raise Exception(f'cannot call non-function {self} on {x}')
 
     x.t.unify_with(a)
-    return val(r, call(self.code, [x.code]))
+    return val(x.t if r is t_same else r, call(self.code, [x.code]))
 
   def __if__(self, t, f):
     """
@@ -226,4 +304,5 @@ class val:
                ast.IfExp(test=self.code, body=t.code, orelse=f.code))
 
 
-fn_val = with_typevars(lambda v: val.of_fn([v], v, fn))
+fn_val     = with_typevars(lambda v: val.of_fn([v], v, fn))
+packed_val = val.of(t_dynamic, unpack_array)
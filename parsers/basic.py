@@ -2,6 +2,8 @@
 A library of parse elements that are used in multiple places within BlendScript.
 """
 
+import ast
+
 from .peg  import *
 from .expr import *
 
@@ -67,6 +69,36 @@ def lambda_parser(expr, modifier, argname, argtype):
     modifier(expr.scoped_subexpression(scope().bind(**{argname: argref}))))
 
 
+def spanned(p):
+  """
+  Returns (v, start, end) for the val parsed by p, where start and end bound
+  the source it came from, minus surrounding whitespace. If v's code is a node
+  we built for this parse, it's tagged with the span for compiler/srcmap.py.
+  """
+  parser(p)
+  def f(s, i):
+    v, i2 = p(s, i)
+    if i2 is None: return (v, i2)
+    j, k = i, i2
+    while j < k and s[j] in b' \t\r\n': j += 1
+    while k > j and s[k - 1] in b' \t\r\n': k -= 1
+    if isinstance(v.code, (ast.Call, ast.IfExp, ast.Tuple)) \
+       and not hasattr(v.code, 'span'):
+      v.code.span = (j, k)
+    return ((v, j, k), i2)
+  return parserify(f)
+
+
+def apply_spanned(f, x):
+  """
+  Applies a spanned function to a spanned argument; the application spans
+  both.
+  """
+  v = f[0](x[0])
+  v.code.span = (f[1], x[2])
+  return (v, f[1], x[2])
+
+
 def associate_fncalls(xs):
   """
   Looks holistically at a series of terms placed next to each other and finds a
@@ -81,15 +113,19 @@ def associate_fncalls(xs):
   functions that can be reduced? When that ambiguity exists, we prefer to leave
   toplevel functions undersaturated, consuming arguments in as many
   sub-functions as we can.
+
+  Terms are (val, start, end) triples from spanned(), so each application we
+  build can be tagged with its source span.
   """
   vs        = [xs[0]]
   rem_arity = len(xs)
 
   for x in xs[1:]:
     rem_arity -= 1
-    if vs[-1].t.value_arity() < 0:
-      vs[-1] = vs[-1](x)
-    elif rem_arity > vs[-1].t.value_arity() and x.t.arg_type() is not None:
+    if vs[-1][0].t.value_arity() < 0:
+      vs[-1] = apply_spanned(vs[-1], x)
+    elif rem_arity > vs[-1][0].t.value_arity() \
+         and x[0].t.arg_type() is not None:
       # We need to reduce arity because the head expression isn't a dynamic and
       # we have too many arguments. Begin collapsing them opportunistically.
       # Note that dynamics aren't opportunistic functions; folding happens only
@@ -99,21 +135,21 @@ def associate_fncalls(xs):
       # Apply the top value to x. Back out of paren-groups as long as the top
       # values are saturated, since we wouldn't be able to apply those to any
       # further values.
-      vs[-1] = vs[-1](x)
-      while vs[-1].t.value_arity() == 0 and len(vs) > 1:
+      vs[-1] = apply_spanned(vs[-1], x)
+      while vs[-1][0].t.value_arity() == 0 and len(vs) > 1:
         v = vs.pop()
-        vs[-1] = vs[-1](v)
+        vs[-1] = apply_spanned(vs[-1], v)
 
   # Apply all deferred right-associations.
   while len(vs) > 1:
     v = vs.pop()
-    vs[-1] = vs[-1](v)
+    vs[-1] = apply_spanned(vs[-1], v)
 
-  return vs[-1]
+  return vs[-1][0]
 
 
 def add_fncalls(atom):
-  return pmap(associate_fncalls, plus(atom))
+  return pmap(associate_fncalls, plus(spanned(atom)))
 
 
 def list_subscope(atom, subscope):
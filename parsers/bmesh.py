@@ -16,8 +16,6 @@ variables to hold onto them; instead what we want is a scoped context within
 which we can refer to specific collections.
 """
 
-from time import time
-
 from ..compatibility import *
 
 from .peg   import *
@@ -26,56 +24,9 @@ from .expr  import *
 from .types import *
 from .val   import *
 
-from ..blender.blender_objects import *
-from ..blender.bmesh           import *
-from ..blender.gc              import *
-from ..compiler.types          import *
-from ..runtime.fn              import *
-
-
-try:
-  import bmesh
-  import bpy
-  import mathutils as mu
-
-  def apply_bmesh_op(b, op):
-    if getattr(op, '__iter__', None):
-      b.push()
-      for o in op:
-        b = apply_bmesh_op(b, o)
-      return b.pop()
-    else:
-      return op(b)
-
-  def make_bmesh(ops):
-    """
-    Creates a hash-memoized bmesh object from the specified list of operations.
-    """
-    def generate_bmesh(ops, name):
-      t0 = time()
-      b  = bmesh_and_selection(bmesh.new())
-      b  = apply_bmesh_op(b, ops)
-      m  = b.render(name)
-      t1 = time()
-      if t1 - t0 > 0.1: print(f'{int((t1 - t0) * 1000)}ms to render mesh {name}')
-      return gc_tag(m)
-
-    return add_hashed(bpy.data.meshes, tuple(ops), generate_bmesh)
-
-except ModuleNotFoundError:
-  blender_not_found()
-  def make_bmesh(ops): print(f'make_bmesh({ops})')
-
-
-# NOTE: the type system won't understand this to be a callable type, but in
-# reality these are preloaded method calls, which are Python functions. This
-# prevents the parser from trying to invoke mesh ops on each other in certain
-# cases.
-t_bmesh_op     = atom_type('B/meshop')
-t_bmesh_op_arg = atom_type('B/meshoparg')
-
-t_bmesh_tag   = atom_type('B/meshtag')
-t_bmesh_query = atom_type('B/meshquery')
+from ..blender.meshes import *
+from ..compiler.types import *
+
 
 type_expr.bind(**{
   'B/meshop':    t_bmesh_op,
@@ -100,14 +51,8 @@ bmesh_query.add(
 
   p_typed(t_bmesh_query, p_list(re_str(r'[FEV]|\^[xyzXYZ]'), bmesh_q_atom)),
   p_typed(t_bmesh_query, p_list(re_str(r'[-\+\*]'), bmesh_q_atom, bmesh_q_atom)),
-  p_typed(t_bmesh_query, p_list(re_str(r'B'),       val_atom,     val_atom)))
-
-
-make_bmesh_op_arg = val.of_fn([t_string, t_dynamic], t_bmesh_op_arg,
-                              lambda arg, val: (arg, val))
+  p_typed(t_bmesh_query, p_list(re_str(r'[BR]'),    val_atom,     val_atom)))
 
-make_bmesh_op = val.of_fn([t_string, t_list(t_bmesh_op_arg)], t_bmesh_op,
-                          lambda m, kwps: preloaded_method(m, **dict(kwps)))
 
 def p_bmesh_op_arg(name, p):
   return pmap(make_bmesh_op_arg(val.lit(t_string, name)), p)
@@ -129,6 +74,7 @@ mesh_op_scope.ops.add(**{
   ':':  p_bmesh_op('bind',         bmesh_q, bmesh_r),
   'V':  p_bmesh_op('create_vert',  bmesh_r, p_bmesh_op_arg('v', val_expr)),
   'V0': p_bmesh_op('create_vert',  bmesh_r),
+  'V*': p_bmesh_op('create_verts', bmesh_r, p_bmesh_op_arg('vs', val_expr)),
 
   'c': p_bmesh_op('create_cube',  bmesh_r, p_bmesh_op_arg('dv', val_expr)),
   'b': p_bmesh_op('create_box',   bmesh_r, p_bmesh_op_arg('v1', val_atom),
@@ -156,7 +102,6 @@ mesh_op_scope.ops.add(**{
     maybe(p_bmesh_op_arg('delta',  iseq(1, lit('+'), val_atom))))})
 
 
-make_bmesh_fn = val.of_fn([t_list(t_bmesh_op)], t_blendmesh, make_bmesh)
 val_atom.ops.add(**{
   'm[': list_subscope(val_atom, mesh_op_scope),
   'm<': pflatmap(const(pmap(make_bmesh_fn,
@@ -38,12 +38,14 @@ class scope:
     self.ops      = dsp()
     self.literals = alt()
     self.bindings = dsp()
+    self.values   = {}
     self.parser1  = modifier(alt(self.bindings, self.literals))
     self.parser2  = modifier(self.ops)
 
   def bind(self, **bindings):
     for b, v in bindings.items():
       self.bindings.add(**{b: const(v, empty)})
+      self.values[b] = v
     return self
 
 
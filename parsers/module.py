@@ -0,0 +1,256 @@
+"""
+Multi-file BlendScript modules.
+
+@"parts.bs body parses body with the definitions from parts.bs in scope. A
+module file is a series of definitions, each a name followed by a value that
+can refer to anything defined before it. Each definition starts at the
+beginning of a line and ends before the next line that isn't indented, so a
+value can continue onto indented lines. Modules can import other modules;
+those names are visible to the rest of the file but aren't re-exported:
+
+@"fasteners.bs
+bolt_len 40
+bolt \l N ...
+plate ...
+
+Relative paths are resolved against the importing file, or the current
+directory at toplevel; in Blender, //parts.bs is relative to the .blend file.
+
+Each module is parsed and compiled once and cached by path, under a key that
+hashes its source together with the keys of the modules it imports. Editing a
+file recompiles that module and everything that imports it, and nothing else.
+A module's definitions are evaluated at most once per blendscript.run(), no
+matter how many times it's imported.
+"""
+
+import ast
+import os
+import re as regex
+
+from functools import partial
+from hashlib   import sha256
+
+from .peg   import *
+from .basic import *
+from .expr  import *
+from .val   import val_atom, val_expr
+
+from ..compiler.lift   import closure_lifter
+from ..compiler.srcmap import locate, register_source
+from ..compiler.val    import *
+
+
+try:
+  import bpy
+  def blend_relative(path): return bpy.path.abspath(path)
+
+except ModuleNotFoundError:
+  def blend_relative(path): return path
+
+
+p_module_path  = re(r'([^\s()\[\]{}]+)')
+definition_end = regex.compile(rb'\n(?=\S)')
+
+
+class source_module:
+  """
+  A compiled module file. f evaluates the module's definitions and returns
+  them as a tuple; exports maps each exported name to a val that fetches it
+  for this run.
+  """
+  cache      = {}
+  loading    = []
+  generation = 0
+
+  def __init__(self, path, digest, deps, names, types, impure, f):
+    self.path     = path
+    self.digest   = digest
+    self.deps     = [(m.path, m.key) for m in deps]
+    self.key      = sha256(digest + b''.join(m.key for m in deps)).digest()
+    self.impure   = impure
+    self.f        = f
+    self.value    = None
+    self.value_of = None
+
+    self.exports = {}
+    self.getters = []
+    for i, (n, t) in enumerate(zip(names, types)):
+      getter = val.of(t_dynamic, partial(self.export, i),
+                      pure=n not in impure)
+      self.getters.append(getter.code.id)
+      self.exports[n] = val(t, call(getter.code, []))
+
+  def __repr__(self): return f'source_module({self.path!r})'
+
+  def __call__(self):
+    if self.value_of != source_module.generation:
+      self.value    = self.f()
+      self.value_of = source_module.generation
+    return self.value
+
+  def export(self, i): return self()[i]
+
+  def release(self):
+    """
+    Unbinds the globals for this module's exports, once a recompiled version
+    has replaced it; nothing compiled against this version is reused.
+    """
+    for gs in self.getters: val.unbind(gs)
+    self.getters = []
+
+  def scope(self):
+    """
+    Returns a scope that refers to this module's exports by name, for parsing
+    an expression that will be wrapped with bind().
+    """
+    return scope().bind(**{n: val.var_ref(v.t, n)
+                           for n, v in self.exports.items()})
+
+  def bind(self, expr):
+    return val.bind_vars(self.exports, expr)
+
+
+def new_run():
+  """
+  Invalidates the values of all modules, so each is evaluated again the next
+  time it's used.
+  """
+  source_module.generation += 1
+
+
+def module_path(path):
+  if path.startswith('//'): path = blend_relative(path)
+  base = os.path.dirname(source_module.loading[-1]) if source_module.loading \
+    else os.getcwd()
+  return os.path.normpath(os.path.join(base, path))
+
+
+def load_module(path):
+  """
+  Returns the compiled module at path, recompiling it if its source or any of
+  its imports have changed since we last compiled it.
+  """
+  path = module_path(path)
+  if path in source_module.loading: raise ImportError(
+    f'blendscript: circular import of {path} from {source_module.loading[-1]}')
+
+  with open(path, 'rb') as fh: source = fh.read()
+  digest = sha256(source).digest()
+
+  m = source_module.cache.get(path)
+  if m is not None and m.digest == digest \
+     and all(load_module(p).key == k for p, k in m.deps):
+    return m
+
+  source_module.loading.append(path)
+  try:
+    m = compile_module_file(path, source, digest)
+  finally:
+    source_module.loading.pop()
+
+  old = source_module.cache.get(path)
+  if old is not None and old is not m: old.release()
+  source_module.cache[path] = m
+  return m
+
+
+def skip_ignored(s, i):
+  _, i2 = p_ignore(s, i)
+  return i if i2 is None else i2
+
+
+def parse_module_file(path, source):
+  """
+  Parses the definitions in a module file, returning a list of steps: modules
+  to import and (name, val) definitions, in order. Each definition is parsed
+  within the scopes of everything before it.
+  """
+  steps = []
+  depth = 0
+  try:
+    i = skip_ignored(source, 0)
+    while i < len(source):
+      if source.startswith(b'@"', i):
+        m, i = p_module_path(source, i + 2)
+        if i is None: raise SyntaxError(f'blendscript: bad import in {path}')
+        m = load_module(m)
+        steps.append(m)
+        s = m.scope()
+      else:
+        n, i2 = p_varname(source, i)
+        if i2 is None: raise SyntaxError(
+          f'blendscript: expected a definition in {path} at {source[i:]}')
+
+        # The value can't run into the next definition, even if that starts
+        # with something the value could consume
+        m     = definition_end.search(source, i2)
+        end   = len(source) if m is None else m.end()
+        line  = source.count(b'\n', 0, i) + 1
+        where = f'the definition of {n} at {path}:{line}'
+        try:
+          v, i = val_expr(source[:end], i2)
+        except (ImportError, SyntaxError):
+          raise
+        except Exception as e:
+          raise SyntaxError(f'blendscript: in {where}: {e}') from e
+        if i is None or skip_ignored(source[:end], i) != end: raise SyntaxError(
+          f'blendscript: failed to parse {where}: '
+          f'{source[i2:end].decode(errors="replace").strip()}')
+        steps.append((n, v))
+        s = scope().bind(**{n: val.var_ref(v.t, n)})
+
+      val_atom.scopes.append(s)
+      val_atom.alt1.add(s.parser1)
+      val_atom.alt2.add(s.parser2)
+      depth += 1
+      i = skip_ignored(source, i)
+
+  finally:
+    for _ in range(depth):
+      val_atom.scopes.pop()
+      val_atom.alt1.pop()
+      val_atom.alt2.pop()
+
+  return steps
+
+
+def compile_module_file(path, source, digest):
+  steps = parse_module_file(path, source)
+  defs  = dict(s for s in steps if isinstance(s, tuple))
+  names = list(defs)
+
+  # A definition is impure if it refers to anything impure; see
+  # compiler/lift.py. Importers use this to decide what they can hoist.
+  lifter = closure_lifter(fn_val.code.id, val.bound_globals,
+                          val.impure_globals)
+  impure = set()
+  for s in steps:
+    if isinstance(s, source_module):
+      impure |= set(map(sanitize_identifier, s.impure))
+    else:
+      n = sanitize_identifier(s[0])
+      if lifter.pure(s[1].code, frozenset(impure)): impure.discard(n)
+      else:                                          impure.add(n)
+
+  body = val(t_dynamic,
+             ast.Tuple(elts=[val.var_ref(defs[n].t, n).code for n in names],
+                       ctx=ast.Load()))
+  for s in reversed(steps):
+    body = s.bind(body) if isinstance(s, source_module) \
+      else val.bind_vars({s[0]: s[1]}, body)
+
+  body = val(body.t, locate(body.code, source)[0])
+  register_source(path, source)
+  return source_module(
+    path, digest, [s for s in steps if isinstance(s, source_module)],
+    names, [defs[n].t for n in names],
+    {n for n in names if sanitize_identifier(n) in impure},
+    body.compile(path))
+
+
+def import_parser(m):
+  return pmap(m.bind, add_fncalls(val_atom.scoped_subexpression(m.scope())))
+
+
+val_atom.ops.add(**{
+  '@"': pflatmap(pmap(import_parser, pmap(load_module, p_module_path)))})
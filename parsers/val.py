@@ -6,6 +6,9 @@ contextually within value-expressions.
 """
 
 import ast
+import re as regex
+
+from array import array
 
 from .peg   import *
 from .basic import *
@@ -35,10 +38,46 @@ val_atom.literals.add(
   pmaps(lambda t, v: val(t, ast.parse(v).body[0].value),
         iseq([1, 2], lit('{'), type_expr, re('([^\}]+)\}'))))
 
+number_token    = rb'-?(?:\d*\.\d+|\d+\.\d*)(?:[eE][-+]?\d+)?|-?\d+'
+packed_numbers  = regex.compile(number_token)
+packed_elements = regex.compile(
+  rb'\s*((?:(?:%s)\s*,\s*)*(?:%s)\s*,?)\s*\]' % (number_token, number_token))
+
+packed_min_length = 16
+
+
+def p_packed_list(s, i):
+  """
+  Fast path for long list literals that contain only numbers, all ints or all
+  floats; e.g. coordinates exported from CAD. These become a single packed
+  array instead of going through val.list() one element at a time. Anything
+  else, including lists with comments in them, falls back to the normal list
+  parser.
+  """
+  m = packed_elements.match(s, i)
+  if m is None: return fail(None)
+
+  xs = packed_numbers.findall(m.group(1))
+  if len(xs) < packed_min_length: return fail(None)
+
+  floats = sum(1 for x in xs if b'.' in x)
+  if   floats == len(xs): t, typecode, f = t_number, 'd', float
+  elif floats == 0:       t, typecode, f = t_int,    'q', int
+  else:                   return fail(None)
+
+  try:
+    return ok(val.packed(t, array(typecode, map(f, xs))), m.end())
+  except OverflowError:
+    return fail(None)
+
+parserify(p_packed_list)
+
+
 val_atom.ops.add(**{
-  '[': pmaps(val.list, iseq(0,
-                            rep(iseq(0, val_expr, maybe(lit(',')))),
-                            whitespaced(lit(']')))),
+  '[': alt(pmaps(val.list, iseq(0,
+                                rep(iseq(0, val_expr, maybe(lit(',')))),
+                                whitespaced(lit(']')))),
+           p_packed_list),
 
   '\\': pflatmap(
     pmaps(lambda an, at: lambda_parser(val_atom, add_fncalls,
@@ -0,0 +1,151 @@
+"""
+Array-backed runtime values.
+
+Long lists of numbers are stored as packed machine arrays rather than tuples of
+Python objects. packed_array presents such a buffer as an immutable sequence
+that behaves like the tuple it replaces, without copying it. vec3_array does
+the same for lists of 3D vectors, as one (N, 3) NumPy array.
+"""
+
+from collections.abc import Sequence
+
+
+class packed_array(Sequence):
+  """
+  A read-only sequence view of a buffer of numbers. data is a memoryview cast
+  to the element type, e.g. memoryview(b).cast('d').
+  """
+  __slots__ = ('data',)
+
+  def __init__(self, data): self.data = data
+
+  def __len__(self):       return len(self.data)
+  def __iter__(self):      return iter(self.data)
+  def __reversed__(self):  return reversed(self.data.tolist())
+  def __contains__(self, x): return x in self.data
+
+  def __getitem__(self, i):
+    if isinstance(i, slice): return packed_array(self.data[i])
+    return self.data[i]
+
+  def __repr__(self): return repr(tuple(self.data))
+  def __hash__(self): return hash(tuple(self.data))
+
+  def __eq__(self, xs):
+    if isinstance(xs, packed_array): return self.data == xs.data
+    return isinstance(xs, tuple) and tuple(self.data) == xs
+
+  def __add__(self, xs):  return tuple(self.data) + tuple(xs)
+  def __radd__(self, xs): return tuple(xs) + tuple(self.data)
+  def __mul__(self, n):   return tuple(self.data) * n
+  def __rmul__(self, n):  return n * tuple(self.data)
+
+  # Orderings compare like the tuples these stand in for
+  def __lt__(self, xs): return tuple(self.data) <  as_tuple(xs)
+  def __le__(self, xs): return tuple(self.data) <= as_tuple(xs)
+  def __gt__(self, xs): return tuple(self.data) >  as_tuple(xs)
+  def __ge__(self, xs): return tuple(self.data) >= as_tuple(xs)
+
+  def tolist(self): return self.data.tolist()
+
+
+def as_tuple(xs):
+  return tuple(xs.data) if isinstance(xs, packed_array) else xs
+
+
+def unpack_array(b, typecode):
+  """
+  Returns a packed_array over the bytes b without copying them.
+  """
+  return packed_array(memoryview(b).cast(typecode))
+
+
+class vec3_array(Sequence):
+  """
+  A list of 3D vectors stored as one read-only (N, 3) float64 NumPy array,
+  data, instead of N vector objects. It behaves like the tuple of vectors it
+  replaces: indexing returns a single frozen vector (built by vec3_array.vector,
+  which runtime/blendermath.py sets), and slicing returns another vec3_array
+  sharing data. Whole-list geometry runs in NumPy:
+
+  m @ xs       transforms every point by a 3x3 or 4x4 matrix or a quaternion
+  xs + v       translates every point by the vector v (likewise v + xs, xs - v)
+  xs.column(i) returns one coordinate of every point as a packed_array
+  """
+  __slots__ = ('data',)
+  vector    = tuple
+
+  def __init__(self, data):
+    data.flags.writeable = False
+    self.data = data
+
+  def __len__(self):  return len(self.data)
+  def __iter__(self): return map(vec3_array.vector, self.data.tolist())
+
+  def __getitem__(self, i):
+    if isinstance(i, slice): return vec3_array(self.data[i])
+    return vec3_array.vector(self.data[i].tolist())
+
+  def __repr__(self): return repr(tuple(self))
+  def __hash__(self): return hash(self.data.tobytes())
+
+  def __eq__(self, xs):
+    if isinstance(xs, vec3_array): return bool(np.array_equal(self.data, xs.data))
+    return isinstance(xs, tuple) and tuple(self) == xs
+
+  def __add__(self, o):
+    if isinstance(o, vec3_array):
+      return vec3_array(np.concatenate([self.data, o.data]))
+    if isinstance(o, (tuple, list)): return tuple(self) + tuple(o)
+    return vec3_array(self.data + point(o))
+
+  def __radd__(self, o):
+    if isinstance(o, (tuple, list)): return tuple(o) + tuple(self)
+    return vec3_array(point(o) + self.data)
+
+  def __sub__(self, o):     return vec3_array(self.data - point(o))
+  def __rsub__(self, o):    return vec3_array(point(o) - self.data)
+  def __rmatmul__(self, m): return vec3_array(transform_rows(m, self.data))
+
+  def column(self, i):
+    return packed_array(memoryview(np.ascontiguousarray(self.data[:, i])))
+
+
+try:
+  import numpy as np
+
+  def point(v):
+    p = np.asarray(v, dtype=np.float64)
+    if p.shape != (3,): raise TypeError(f'expected a 3D vector, got {v!r}')
+    return p
+
+  def transform_rows(m, a):
+    """
+    Applies the matrix or quaternion m to each row of the (N, 3) array a.
+    """
+    M = np.asarray(m, dtype=np.float64)
+    if M.shape == (4,): M = np.asarray(m.to_matrix(), dtype=np.float64)
+    if M.shape == (3, 3): return a @ M.T
+    if M.shape == (4, 4): return a @ M[:3, :3].T + M[:3, 3]
+    raise TypeError(f'can\'t transform 3D points by {m!r}')
+
+  def pack_vec3(xs):
+    """
+    Returns xs, a list of 3D vectors, as a vec3_array.
+    """
+    if isinstance(xs, vec3_array): return xs
+    a = np.array(xs if isinstance(xs, Sequence) else list(xs), dtype=np.float64)
+    if a.size == 0: a = a.reshape(0, 3)
+    if a.ndim != 2 or a.shape[1] != 3: raise TypeError(
+      f'expected a list of 3D vectors, got an array of shape {a.shape}')
+    return vec3_array(a)
+
+  def matmul(x, y):
+    """
+    x @ y, also for mathutils matrices applied to vec3_arrays.
+    """
+    return y.__rmatmul__(x) if isinstance(y, vec3_array) else x @ y
+
+except ModuleNotFoundError:
+  def pack_vec3(xs): return tuple(xs)
+  def matmul(x, y):  return x @ y
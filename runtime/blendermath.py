@@ -1,15 +1,13 @@
 """
-Blender math bindings, if we have them.
+Blender math bindings, if we have them. Outside Blender we use the NumPy
+stand-in in runtime/npmath.py, and tuples if we don't have NumPy either.
 """
 
 from ..compatibility import *
 
 from ..compiler.val   import *
 from ..compiler.types import *
-from ..parsers.peg    import *
-from ..parsers.basic  import *
-from ..parsers.val    import *
-from .fn              import fn
+from .arrays          import vec3_array
 
 
 # TODO: add these bindings to type exprs
@@ -23,7 +21,15 @@ t_mat44      = atom_type('M44')
 
 try:
   import mathutils as m
+except ModuleNotFoundError:
+  blender_not_found()
+  try:
+    from . import npmath as m
+  except ModuleNotFoundError:
+    m = None
+
 
+if m is not None:
   vec3        = val.of_fn([t_list(t_number)], t_vec3,       lambda *xs: m.Vector(*xs).freeze())
   quaternion  = val.of_fn([t_list(t_number)], t_quaternion, lambda *xs: m.Quaternion(*xs).freeze())
   translation = val.of_fn([t_vec3],   t_mat44, lambda *xs: m.Matrix.Translation(*xs).freeze())
@@ -32,11 +38,11 @@ try:
   rotatey     = val.of_fn([t_number], t_mat33, lambda t: m.Matrix.Rotation(t, 3, 'Y').freeze())
   rotatez     = val.of_fn([t_number], t_mat33, lambda t: m.Matrix.Rotation(t, 3, 'Z').freeze())
 
-  val_atom.bind(I=val.of(t_mat33, m.Matrix.Identity(3).freeze()))
+  identity    = val.of(t_mat33, m.Matrix.Identity(3).freeze())
 
-except ModuleNotFoundError:
-  blender_not_found()
+  vec3_array.vector = lambda xs: m.Vector(xs).freeze()
 
+else:
   vec3        = val.of_fn([t_list(t_number)], t_vec3,       tuple)
   quaternion  = val.of_fn([t_list(t_number)], t_quaternion, tuple)
   translation = val.of_fn([t_vec3],   t_mat44, tuple)
@@ -45,26 +51,4 @@ except ModuleNotFoundError:
   rotatey     = val.of_fn([t_number], t_mat33, tuple)
   rotatez     = val.of_fn([t_number], t_mat33, tuple)
 
-  val_atom.bind(I=val.lit(t_mat33, "identity"))
-
-
-zero = val.lit(t_number, 0)
-
-val_atom.ops.add(
-  x=pmap( lambda x:    vec3(val.list(x, zero, zero)), val_atom),
-  y=pmap( lambda y:    vec3(val.list(zero, y, zero)), val_atom),
-  z=pmap( lambda z:    vec3(val.list(zero, zero, z)), val_atom),
-  X=pmaps(lambda y, z: vec3(val.list(zero, y, z)), exactly(2, val_atom)),
-  Y=pmaps(lambda x, z: vec3(val.list(x, zero, z)), exactly(2, val_atom)),
-  Z=pmaps(lambda x, y: vec3(val.list(x, y, zero)), exactly(2, val_atom)),
-
-  v=pmaps(fn(vec3)       @ fn(val.list), exactly(3, val_atom)),
-  q=pmaps(fn(quaternion) @ fn(val.list), exactly(4, val_atom)),
-)
-
-val_atom.bind(
-  T=translation,
-  S=scale,
-  Rx=rotatex,
-  Ry=rotatey,
-  Rz=rotatez)
+  identity    = val.lit(t_mat33, "identity")
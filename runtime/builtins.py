@@ -0,0 +1,132 @@
+"""
+BlendScript's builtin functions and constants, by the names the toplevel
+grammar binds them to (see runtime/val.py). Nothing here imports the parser,
+so a module written by compile_module() can refer to its builtins through
+bindings without loading it; see compiler/aot.py.
+"""
+
+from math import *
+
+from ..compiler.types import *
+from ..compiler.val   import *
+from .blendermath     import *
+from .blendermath     import m as mu
+from .arrays          import matmul, pack_vec3
+from .fn              import fn, memoize
+from .load            import load_csv, load_npy, load_raw
+from .parallel        import parallel_map
+from .vectorize       import arraywise, rowwise, rows_matmul, ufunc
+
+
+def number_fn(f, vf=None):
+  return val.of_fn([t_number], t_number, f, vectorized=vf)
+
+def v3_fn(f, vf=None): return val.of_fn([t_vec3], t_vec3,   f, vectorized=vf)
+def vn_fn(f, vf=None): return val.of_fn([t_vec3], t_number, f, vectorized=vf)
+
+def unop_fn(f, vf=None):
+  return with_typevars(lambda v: val.of_fn([v], v, f, vectorized=vf))
+
+def binop_fn(f, vf=None):
+  return with_typevars(lambda v: val.of_fn([v, v], v, f, vectorized=vf))
+
+def cmp_fn(f, vf=None):
+  return with_typevars(lambda v: val.of_fn([v, v], t_bool, f, vectorized=vf))
+
+
+range_fn = val.of_fn([t_int], t_list(t_int), range)
+
+bindings = {
+  'tau': val.lit(t_number, tau),
+
+  'dr':   number_fn(radians, ufunc('radians')),
+  'rd':   number_fn(degrees, ufunc('degrees')),
+  'tr':   number_fn(*arraywise(lambda t: tau * t)),
+  'qr':   number_fn(*arraywise(lambda q: tau * q / 4)),
+
+  # NumPy's transcendental functions can disagree with math's in the last bit;
+  # see use_fast_math()
+  'sin':  number_fn(sin,  ufunc('sin', exact=False)),
+  'cos':  number_fn(cos,  ufunc('cos', exact=False)),
+  'tan':  number_fn(tan,  ufunc('tan', exact=False)),
+  'asin': number_fn(asin, ufunc('arcsin', exact=False)),
+  'acos': number_fn(acos, ufunc('arccos', exact=False)),
+  'atan': number_fn(atan, ufunc('arctan', exact=False)),
+
+  'sqrt':  number_fn(sqrt, ufunc('sqrt')),
+  'erf':   number_fn(erf),
+  'gamma': number_fn(gamma),
+  'exp':   number_fn(exp,  ufunc('exp', exact=False)),
+  'log':   number_fn(log,  ufunc('log', exact=False)),
+  'log2':  number_fn(log2, ufunc('log2', exact=False)),
+
+  'L':  with_typevars(lambda v: val.of_fn([t_list(v)], t_list(v), list)),
+  'L3': val.of_fn([t_list(t_vec3)], t_list(t_vec3), pack_vec3),
+
+  # files can change between runs, so these aren't pure; see runtime/load.py
+  'npy': val.of_fn([t_string], t_dynamic, load_npy, pure=False),
+  'csv': val.of_fn([t_string], t_dynamic, load_csv, pure=False),
+  'raw': val.of_fn([t_string, t_string], t_list(t_number), load_raw,
+                   pure=False),
+
+  'memo': with_typevars(
+    lambda a, b: val.of_fn([t_int, t_fn(a, b)], t_same, memoize)),
+
+  '`':  with_typevars(lambda v: val.of_fn([t_int, t_list(v)], v,
+                                          lambda i, xs: xs[i])),
+
+  '*|': with_typevars(
+    lambda a, b: val.of_fn([t_fn(a, b), t_list(a)], t_list(b), parallel_map)),
+
+  '$':  with_typevars(
+    lambda a, b, c: val.of_fn([t_fn(a, t_fn(b, c))], t_fn(b, t_fn(a, c)),
+                              lambda f: fn(lambda x: fn(lambda y: f(y)(x))))),
+
+  # + and * commute, so their ufuncs also vectorize / + xs and / * xs
+  '+':  binop_fn(lambda x, y: x + y, ufunc('add')),
+  '*':  binop_fn(lambda x, y: y * x, ufunc('multiply')),
+  '/':  binop_fn(*arraywise(lambda x, y: y / x)),
+  '%':  binop_fn(*arraywise(lambda x, y: y % x)),
+  '**': binop_fn(*arraywise(lambda x, y: y ** x, exact=False)),
+  '.':  binop_fn(matmul, rowwise(rows_matmul)),
+  '-':  unop_fn(*arraywise(lambda x: -x)),
+  '!':  unop_fn(lambda x: not x, ufunc('logical_not')),
+
+  '==': cmp_fn(*arraywise(lambda x, y: x == y)),
+  '!=': cmp_fn(*arraywise(lambda x, y: x != y)),
+  '<=': cmp_fn(*arraywise(lambda x, y: x <= y)),
+  '>=': cmp_fn(*arraywise(lambda x, y: x >= y)),
+  '>':  cmp_fn(*arraywise(lambda x, y: x > y)),
+  '<':  cmp_fn(*arraywise(lambda x, y: x < y)),
+
+  '~':  unop_fn(*arraywise(lambda x: ~x)),
+  '&':  binop_fn(lambda x, y: x & y, ufunc('bitwise_and')),
+  '|':  binop_fn(lambda x, y: x | y, ufunc('bitwise_or')),
+  '^':  binop_fn(lambda x, y: x ^ y, ufunc('bitwise_xor')),
+
+  'T':  translation,
+  'S':  scale,
+  'Rx': rotatex,
+  'Ry': rotatey,
+  'Rz': rotatez,
+  'I':  identity}
+
+
+if mu is not None:
+  # mask() and column() vectorize these over [V3] lists stored as vec3_arrays;
+  # + 0.0 turns the -0.0s from masking negative coordinates into 0.0
+  def mask(*k):   return rowwise(lambda a: a * k + 0.0)
+  def column(i):  return rowwise(lambda a: a[:, i])
+
+  bindings.update({
+    '%x':  v3_fn(lambda v: mu.Vector((v[0], 0, 0)), mask(1, 0, 0)),
+    '%y':  v3_fn(lambda v: mu.Vector((0, v[1], 0)), mask(0, 1, 0)),
+    '%z':  v3_fn(lambda v: mu.Vector((0, 0, v[2])), mask(0, 0, 1)),
+
+    '%xy': v3_fn(lambda v: mu.Vector((v[0], v[1], 0)), mask(1, 1, 0)),
+    '%xz': v3_fn(lambda v: mu.Vector((v[0], 0, v[2])), mask(1, 0, 1)),
+    '%yz': v3_fn(lambda v: mu.Vector((0, v[1], v[2])), mask(0, 1, 1)),
+
+    '.x': vn_fn(lambda v: v[0], column(0)),
+    '.y': vn_fn(lambda v: v[1], column(1)),
+    '.z': vn_fn(lambda v: v[2], column(2))})
@@ -2,7 +2,11 @@
 Function objects and utilities for BlendScript runtime values.
 """
 
-from functools import reduce
+from collections     import OrderedDict
+from collections.abc import Iterator
+from functools       import reduce
+
+from .vectorize import bind_scalars, vector_map, vector_filter, vector_reduce
 
 
 class fn:
@@ -14,14 +18,24 @@ class fn:
   (f / xs) == reduce(f, xs)
   (f @ g)  == compose(f, g)
 
+  * and % return lazy streams that fuse with each other and with
+  compositions; see stream below.
+
   For convenience we also have:
 
   (f + g)(x) == f(x) + g(x)
   (-f)(x)    == -f(x)
+
+  vectorized, if given, computes f elementwise over NumPy arrays; *, %, and /
+  use it for numeric lists (see runtime/vectorize.py).
   """
-  def __init__(self, f, source=None):
-    self.f      = f.f if type(f) == type(self) else f
-    self.source = source
+  __slots__ = ('f', 'source', 'vectorized')
+
+  def __init__(self, f, source=None, vectorized=None):
+    self.f          = f.f if type(f) == type(self) else f
+    self.source     = source
+    self.vectorized = vectorized if type(f) != type(self) \
+                      else vectorized or f.vectorized
     if getattr(self.f, '__call__', None) is None: raise RuntimeError(
       f'tried to create fn() of non-callable object {self.f}')
 
@@ -31,9 +45,24 @@ class fn:
 
   def __add__(self, g):       return fn(lambda *xs: self.f(*xs) + g(*xs))
   def __neg__(self):          return fn(lambda *xs: -self.f(*xs))
-  def __rmul__(self, xs):     return map(self.f, xs)
-  def __rtruediv__(self, xs): return reduce(self.f, xs)
-  def __rmod__(self, xs):     return filter(self.f, xs)
+  def __rmul__(self, xs):
+    if self.vectorized is not None:
+      r = vector_map(self.vectorized, xs)
+      if r is not None: return r
+    return stream.of(xs).then('m', self.f)
+
+  def __rtruediv__(self, xs):
+    if self.vectorized is not None:
+      r = vector_reduce(self.vectorized, xs)
+      if r is not None: return r
+    return reduce(self.f, xs)
+
+  def __rmod__(self, xs):
+    if self.vectorized is not None:
+      r = vector_filter(self.vectorized, xs)
+      if r is not None: return r
+    return stream.of(xs).then('f', self.f)
+
   def __matmul__(self, g):    return compose(self.f, g)
 
   def __and__(self, g): return fn(lambda *xs: self.f(*xs) & g(*xs))
@@ -41,6 +70,125 @@ class fn:
   def __xor__(self, g): return fn(lambda *xs: self.f(*xs) ^ g(*xs))
 
 
+class curried(fn):
+  """
+  An n-ary function applied to fewer than n arguments so far. Calling it
+  appends to args and either calls target, once there are enough, or returns
+  another curried; there's no partial() or closure in between, and nothing is
+  formatted until someone prints it. name is what to print when args is
+  empty.
+
+  f is the curried function itself, so the fn operators map it like any other
+  function; vectorized binds args to the target's NumPy version on demand.
+  """
+  __slots__ = ('target', 'arity', 'args', 'name', 'target_vectorized')
+
+  def __init__(self, target, arity, args=(), name=None, vectorized=None):
+    self.target            = target
+    self.arity             = arity
+    self.args              = args
+    self.name              = name
+    self.target_vectorized = vectorized
+
+  def __call__(self, *xs):
+    args = self.args + xs
+    if len(args) >= self.arity: return self.target(*args)
+    return curried(self.target, self.arity, args, None, self.target_vectorized)
+
+  @property
+  def f(self): return self
+
+  @property
+  def vectorized(self):
+    return bind_scalars(self.target_vectorized, self.args) if self.args \
+      else self.target_vectorized
+
+  @property
+  def source(self):
+    if not self.args: return self.name or str(self.target)
+    return f'{self.target}({", ".join(map(str, self.args))}, ...)'
+
+
+
+def fused(kinds):
+  """
+  Returns a generator function that runs a pipeline of stages over xs in one
+  loop, given the stage functions as arguments. kinds has one letter per
+  stage: m to map, f to filter.
+  """
+  if kinds not in fused.loops:
+    lines = [f'def loop(xs, {", ".join(f"f{i}" for i in range(len(kinds)))}):',
+             '  for x in xs:']
+    for i, k in enumerate(kinds):
+      lines.append(f'    x = f{i}(x)' if k == 'm' else
+                   f'    if not f{i}(x): continue')
+    lines.append('    yield x')
+    env = {}
+    exec('\n'.join(lines), env)
+    fused.loops[kinds] = env['loop']
+  return fused.loops[kinds]
+
+fused.loops = {}
+
+
+class stream:
+  """
+  A lazy pipeline of maps and filters over a source iterable. Mapping or
+  filtering a stream adds a stage instead of wrapping another iterator, and
+  mapping a composition splices its functions in as separate stages. When the
+  stream is iterated, the whole pipeline runs as one loop generated for its
+  shape, so each element costs one call per function rather than an iterator
+  and a frame per stage.
+
+  Streams can be iterated more than once if their source can; reusable()
+  materializes them like any other iterator.
+  """
+  __slots__ = ('source', 'kinds', 'fs')
+
+  def __init__(self, source, kinds='', fs=()):
+    self.source = source
+    self.kinds  = kinds
+    self.fs     = fs
+
+  @classmethod
+  def of(cls, xs):
+    return xs if isinstance(xs, stream) else cls(xs)
+
+  def then(self, kind, f):
+    if kind == 'm' and isinstance(f, composition):
+      fs = f.fs[::-1]
+      return stream(self.source, self.kinds + 'm' * len(fs), self.fs + fs)
+    return stream(self.source, self.kinds + kind, self.fs + (f,))
+
+  def __iter__(self):
+    if not self.kinds:    return iter(self.source)
+    if self.kinds == 'm': return map(self.fs[0], self.source)
+    return fused(self.kinds)(self.source, *self.fs)
+
+  def __repr__(self):
+    return f'stream({self.source!r}, {self.kinds!r})'
+
+
+class composition:
+  """
+  f0(f1(...fn(*xs, **d))), flattened so that composing compositions doesn't
+  nest calls. The call itself is generated for the number of functions.
+  """
+  __slots__ = ('fs', 'call')
+  calls     = {}
+
+  def __init__(self, fs):
+    self.fs = fs
+    n = len(fs)
+    if n not in composition.calls:
+      body = '*xs, **d'
+      for i in reversed(range(n)): body = f'f{i}({body})'
+      args = ', '.join(f'f{i}' for i in range(n))
+      composition.calls[n] = eval(f'lambda {args}: lambda *xs, **d: {body}')
+    self.call = composition.calls[n](*fs)
+
+  def __call__(self, *xs, **d): return self.call(*xs, **d)
+
 
 def compose(f, g):
   """
@@ -48,7 +196,11 @@ def compose(f, g):
   and kwargs; the outer function just receives a singular result from the inner
   one.
   """
-  return fn(lambda *xs, **d: f(g(*xs, **d)))
+  if isinstance(f, fn): f = f.f
+  if isinstance(g, fn): g = g.f
+  fs = (f.fs if isinstance(f, composition) else (f,)) \
+     + (g.fs if isinstance(g, composition) else (g,))
+  return fn(composition(fs))
 
 
 def method(m):
@@ -61,11 +213,146 @@ def method(m):
             source=f'.{m}(...)')
 
 
-def preloaded_method(_, *args, **kwargs):
+class preloaded_method(fn):
   """
-  Returns a fn() that invokes the specified method on an object and returns the
+  A fn() that invokes the specified method on an object and returns the
   result. The method will be invoked with the specified set of preloaded
-  parameters.
+  parameters, which stay visible as name, args, and kwargs so a list of mesh
+  ops can be inspected before it runs.
   """
-  return fn(lambda o: getattr(o, _)(*args, **kwargs),
-            source=f'.{_}(*{args}, **{kwargs})')
+  __slots__ = ('name', 'args', 'kwargs')
+
+  def __init__(self, _, *args, **kwargs):
+    self.name   = _
+    self.args   = args
+    self.kwargs = kwargs
+    super().__init__(lambda o: getattr(o, _)(*args, **kwargs),
+                     source=f'.{_}(*{args}, **{kwargs})')
+
+
+def reusable(x):
+  """
+  Materializes x if it's a one-shot iterator or a stream (e.g. the result of
+  f * xs) so it can be consumed more than once without being recomputed.
+  Anything else is returned as-is.
+  """
+  return tuple(x) if isinstance(x, (Iterator, stream)) else x
+
+
+class lazy:
+  """
+  A value computed by f() the first time it's asked for, then kept; reusable()
+  materializes it, since it can be asked for more than once. If f raises,
+  nothing is kept and the next call tries again. compiler/lift.py binds
+  hoisted invariants to these.
+  """
+  __slots__ = ('f', 'v')
+
+  def __init__(self, f): self.f = f
+
+  def __call__(self):
+    if self.f is not None:
+      self.v = reusable(self.f())
+      self.f = None
+    return self.v
+
+
+def memo_key(x):
+  """
+  Returns a hashable key that's equal for equal arguments. Frozen mathutils
+  values and tuples hash as themselves; unfrozen vectors, matrices, and lists
+  are keyed by their contents.
+  """
+  try:
+    hash(x)
+    return x
+  except TypeError:
+    return (type(x).__name__, tuple(map(memo_key, x)))
+
+
+class memoized:
+  """
+  A function with a bounded LRU cache of its results, keyed on argument
+  values. Streams are materialized before they're keyed or passed to f.
+
+  Curried functions are keyed on their whole argument tuple: calling f(x)
+  returns a function if f takes more arguments, and that partial application
+  is cached under (x,) and wrapped so that calling it with y looks up (x, y),
+  and so on until f returns something other than a function.
+
+  hits and misses count lookups; memoized.instances holds every cache created
+  since the last reset_memo_stats(), which blendscript.run() calls.
+  """
+  __slots__ = ('f', 'size', 'cache', 'hits', 'misses')
+  instances = []
+
+  def __init__(self, f, size):
+    self.f      = f
+    self.size   = size
+    self.cache  = OrderedDict()
+    self.hits   = 0
+    self.misses = 0
+    memoized.instances.append(self)
+
+  def __call__(self, x): return self.lookup((), self.f, x)
+
+  def lookup(self, args, f, x):
+    """
+    Returns f(x), where f is self.f already applied to args.
+    """
+    if isinstance(x, (Iterator, stream)): x = tuple(x)
+    args += (x,)
+    try:
+      k = memo_key(args)
+    except TypeError:
+      self.misses += 1
+      return f(x)
+
+    if k in self.cache:
+      self.cache.move_to_end(k)
+      self.hits += 1
+      return self.cache[k]
+
+    self.misses += 1
+    v = reusable(f(x))
+    if isinstance(v, fn): v = fn(memo_partial(self, args, v), source=str(v))
+    self.cache[k] = v
+    if len(self.cache) > self.size: self.cache.popitem(last=False)
+    return v
+
+  def __repr__(self):
+    return f'memoized({self.f}, {len(self.cache)}/{self.size}, ' \
+           f'{self.hits} hits, {self.misses} misses)'
+
+
+class memo_partial:
+  """
+  A memoized function applied to some of its arguments, args; f is the
+  partial application.
+  """
+  __slots__ = ('memo', 'args', 'f')
+
+  def __init__(self, memo, args, f):
+    self.memo = memo
+    self.args = args
+    self.f    = f
+
+  def __call__(self, x): return self.memo.lookup(self.args, self.f, x)
+
+
+def memoize(size, f):
+  """
+  Wraps f in an LRU cache that holds up to size results.
+  """
+  return fn(memoized(f, size), source=f'memo {size} {f}')
+
+
+def memo_stats():
+  """
+  Returns a list of (function, hits, misses, entries) for every memoized
+  function created during the last run.
+  """
+  return [(m.f, m.hits, m.misses, len(m.cache)) for m in memoized.instances]
+
+
+def reset_memo_stats(): memoized.instances.clear()
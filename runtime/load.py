@@ -0,0 +1,167 @@
+"""
+Bulk data from files: point clouds, hole patterns, measured tables.
+
+npy "scan.npy    a NumPy .npy file
+raw "d "xs.bin   a raw binary file of machine numbers; "d is float64, and
+                 any other struct/array typecode works too
+csv "holes.csv   a CSV table of numbers, optionally with a header row
+
+Results use the array-backed list types from runtime/arrays.py: a 1D array is
+a packed_array, an (N, 3) array of numbers is a [V3] vec3_array, and any other
+2D array is a list of packed_array rows.
+
+.npy and raw files are memory-mapped rather than read, so loading them is
+zero-copy: the data isn't parsed or duplicated, and pages come in from disk
+(or the page cache, shared between Blender processes) as they're touched.
+Only CSV files are parsed. Either way, we cache results by path, modification
+time, and size, so rerunning a script doesn't touch files that haven't
+changed.
+
+Because the data is mapped, rewriting a file in place changes values that a
+previous run already loaded from it; write a new file and rename it over the
+old one instead. Relative paths resolve against the current directory, and in
+Blender //data.npy is relative to the .blend file.
+"""
+
+import ast
+import csv
+import mmap
+import os
+import struct
+
+from array import array
+
+from .arrays import packed_array, vec3_array
+
+
+try:
+  import bpy
+  def blend_relative(path): return bpy.path.abspath(path)
+
+except ModuleNotFoundError:
+  def blend_relative(path): return path
+
+
+loaded = {}
+
+def cached(read):
+  """
+  Wraps read(path, *options) so its results are kept until the file at path
+  changes. The BlendScript builtins take the path last.
+  """
+  def f(*xs):
+    path = xs[-1]
+    if path.startswith('//'): path = blend_relative(path)
+    path  = os.path.abspath(path)
+    st    = os.stat(path)
+    k     = (read.__name__, path) + xs[:-1]
+    stamp = (st.st_mtime_ns, st.st_size)
+    e = loaded.get(k)
+    if e is None or e[0] != stamp:
+      e = loaded[k] = (stamp, read(path, *xs[:-1]))
+    return e[1]
+  f.__name__ = read.__name__
+  return f
+
+
+def map_file(path):
+  """
+  Returns a read-only memoryview of the file at path, mapped into memory.
+  """
+  with open(path, 'rb') as fh:
+    if os.fstat(fh.fileno()).st_size == 0: return memoryview(b'')
+    return memoryview(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def rows_of(xs, n, k):
+  """
+  Splits the flat packed list xs into n rows of k.
+  """
+  return tuple(packed_array(xs.data[i * k:(i + 1) * k]) for i in range(n))
+
+
+def read_raw(path, typecode):
+  b = map_file(path)
+  if len(b) % struct.calcsize(typecode): raise ValueError(
+    f'blendscript: {path} is {len(b)} bytes, which isn\'t a whole number of '
+    f'{typecode!r} values')
+  return packed_array(b.cast(typecode))
+
+
+def csv_rows(path):
+  """
+  Returns the rows of a CSV file as lists of floats, skipping a header row.
+  """
+  with open(path, newline='') as fh:
+    rows = [r for r in csv.reader(fh) if r]
+  try:
+    if rows: list(map(float, rows[0]))
+  except ValueError:
+    rows = rows[1:]
+
+  try:
+    return [list(map(float, r)) for r in rows]
+  except ValueError as e:
+    raise ValueError(f'blendscript: non-numeric data in {path}: {e}') from None
+
+
+try:
+  import numpy as np
+
+  def as_list(a):
+    """
+    Returns the 1D or 2D array a as a packed_array, vec3_array, or tuple of
+    packed_array rows, without copying it if it's already in a usable layout.
+    """
+    if a.dtype.kind not in 'biuf' or a.ndim not in (1, 2): raise TypeError(
+      f'blendscript: can\'t load a {a.ndim}D array of {a.dtype} as a list')
+    if a.ndim == 2 and a.shape[1] == 3 and a.dtype.kind != 'b':
+      return vec3_array(np.ascontiguousarray(a, dtype=np.float64))
+    if not a.dtype.isnative: a = a.astype(a.dtype.newbyteorder('='))
+    xs = packed_array(memoryview(np.ascontiguousarray(a)).cast('B')
+                                                         .cast(a.dtype.char))
+    return xs if a.ndim == 1 else rows_of(xs, *a.shape)
+
+  def read_npy(path):
+    return as_list(np.load(path, mmap_mode='r', allow_pickle=False))
+
+  def read_csv(path):
+    rows = csv_rows(path)
+    if rows and any(len(r) != len(rows[0]) for r in rows): raise ValueError(
+      f'blendscript: rows of {path} have different numbers of columns')
+    a = np.array(rows, dtype=np.float64)
+    return as_list(a[:, 0] if a.ndim == 2 and a.shape[1] == 1 else a)
+
+except ModuleNotFoundError:
+  npy_typecodes = {'<f8': 'd', '<f4': 'f', '<i8': 'q', '<i4': 'i', '<u1': 'B',
+                   '|u1': 'B', '|b1': '?'}
+
+  def read_npy(path):
+    """
+    Reads the header of a little-endian, C-ordered, 1D or 2D .npy file and
+    maps its data, without NumPy.
+    """
+    b = map_file(path)
+    if bytes(b[:6]) != b'\x93NUMPY': raise ValueError(
+      f'blendscript: {path} isn\'t a .npy file')
+    n, start = (struct.unpack('<H', b[8:10])[0], 10) if b[6] == 1 \
+          else (struct.unpack('<I', b[8:12])[0], 12)
+    header = ast.literal_eval(bytes(b[start:start + n]).decode('latin1'))
+    t = npy_typecodes.get(header['descr'])
+    if t is None or header['fortran_order'] \
+       or len(header['shape']) not in (1, 2): raise TypeError(
+      f'blendscript: can\'t load {path} without NumPy')
+
+    xs = packed_array(b[start + n:].cast(t))
+    return xs if len(header['shape']) == 1 else rows_of(xs, *header['shape'])
+
+  def read_csv(path):
+    rows = csv_rows(path)
+    if rows and all(len(r) == 1 for r in rows):
+      return packed_array(memoryview(array('d', (r[0] for r in rows))))
+    return tuple(packed_array(memoryview(array('d', r))) for r in rows)
+
+
+load_npy = cached(read_npy)
+load_raw = cached(read_raw)
+load_csv = cached(read_csv)
@@ -0,0 +1,348 @@
+"""
+A NumPy stand-in for the parts of mathutils that BlendScript uses.
+
+Outside Blender there's no mathutils, so runtime/blendermath.py uses these
+Vector, Matrix, and Quaternion classes instead. The REPL and offline scripts
+can then do real geometry math, and so can profiling runs on machines without
+Blender. The constructors, freeze(), operators, and the Identity, Translation,
+Diagonal, and Rotation constructors behave like mathutils' versions. That
+includes multiplying a 4x4 matrix by a 3D vector, which treats the vector as a
+point. Only what BlendScript needs is here; this isn't a general replacement.
+
+Matrices also have transform(points), which applies the matrix to an (N, 3) or
+(N, 4) array of points in one NumPy call. m @ points does the same when points
+is a 2D array.
+"""
+
+import numpy as np
+
+from math import cos, sin
+
+
+class mathvalue:
+  """
+  Common behavior: values wrap a float64 array a, compare by value, and are
+  hashable once frozen.
+  """
+  __slots__ = ('a', 'is_frozen')
+
+  @classmethod
+  def wrap(cls, a):
+    v = cls.__new__(cls)
+    v.a         = a
+    v.is_frozen = False
+    return v
+
+  def freeze(self):
+    self.is_frozen = True
+    return self
+
+  def copy(self): return self.wrap(self.a.copy())
+
+  def check_mutable(self):
+    if self.is_frozen: raise TypeError(
+      f'{type(self).__name__} is frozen, cannot modify')
+
+  def __array__(self, dtype=None, copy=None):
+    return np.array(self.a, dtype=dtype) if copy else np.asarray(self.a, dtype)
+
+  def __len__(self):  return len(self.a)
+  def __iter__(self): return iter(self.a.tolist())
+
+  def __eq__(self, o):
+    return type(o) is type(self) and self.a.shape == o.a.shape \
+       and bool(np.all(self.a == o.a))
+
+  def __ne__(self, o): return not self == o
+
+  def __hash__(self):
+    if not self.is_frozen: raise TypeError(
+      f'{type(self).__name__} must be frozen to be hashable')
+    return hash((type(self).__name__, self.a.tobytes()))
+
+  def __reduce__(self):
+    return (rebuild, (type(self), self.a, self.is_frozen))
+
+
+def rebuild(cls, a, is_frozen):
+  v = cls.wrap(a)
+  v.is_frozen = is_frozen
+  return v
+
+
+def components(xs):
+  return np.array(xs.a if isinstance(xs, mathvalue) else xs, dtype=np.float64)
+
+
+class Vector(mathvalue):
+  __slots__ = ()
+
+  def __init__(self, xs=(0.0, 0.0, 0.0)):
+    self.a         = components(xs).ravel()
+    self.is_frozen = False
+
+  def __repr__(self): return f'Vector({tuple(self.a.tolist())})'
+
+  def __getitem__(self, i):
+    if isinstance(i, slice): return tuple(self.a[i].tolist())
+    return float(self.a[i])
+
+  def __setitem__(self, i, x):
+    self.check_mutable()
+    self.a[i] = x
+
+  def component(i):
+    def get(self): return float(self.a[i])
+    def set(self, x): self[i] = x
+    return property(get, set)
+
+  x, y, z, w = map(component, range(4))
+  del component
+
+  @property
+  def xy(self): return Vector(self.a[:2])
+
+  @property
+  def length(self): return float(np.linalg.norm(self.a))
+
+  def normalized(self):
+    n = np.linalg.norm(self.a)
+    return self.wrap(self.a / n if n else self.a.copy())
+
+  def dot(self, v):   return float(np.dot(self.a, components(v)))
+  def cross(self, v): return self.wrap(np.cross(self.a, components(v)))
+
+  def to_tuple(self, precision=None):
+    xs = self.a if precision is None else self.a.round(precision)
+    return tuple(xs.tolist())
+
+  def to_2d(self): return self.wrap(np.resize(self.a, 2))
+  def to_3d(self): return self.wrap(np.append(self.a, np.zeros(3))[:3])
+  def to_4d(self): return self.wrap(np.append(self.to_3d().a, 1.0))
+
+  def __neg__(self):       return self.wrap(-self.a)
+  def __pos__(self):       return self.copy()
+  def __truediv__(self, k): return self.wrap(self.a / k)
+
+  def __add__(self, v):
+    return self.wrap(self.a + v.a) if isinstance(v, Vector) else NotImplemented
+
+  def __sub__(self, v):
+    return self.wrap(self.a - v.a) if isinstance(v, Vector) else NotImplemented
+
+  def __mul__(self, k):
+    if isinstance(k, Vector): return self.wrap(self.a * k.a)
+    if isinstance(k, (int, float)): return self.wrap(self.a * k)
+    return NotImplemented
+
+  __rmul__ = __mul__
+
+  def __matmul__(self, o):
+    if isinstance(o, Vector): return float(np.dot(self.a, o.a))
+    if isinstance(o, Matrix): return self.wrap(self.a @ o.a)
+    return NotImplemented
+
+
+class Matrix(mathvalue):
+  __slots__ = ()
+
+  def __init__(self, rows=((1.0, 0.0, 0.0, 0.0), (0.0, 1.0, 0.0, 0.0),
+                           (0.0, 0.0, 1.0, 0.0), (0.0, 0.0, 0.0, 1.0))):
+    self.a         = np.array([components(r) for r in rows])
+    self.is_frozen = False
+    if self.a.ndim != 2: raise ValueError(
+      f'Matrix(): expected a sequence of rows, got {rows!r}')
+
+  def __repr__(self):
+    rows = ',\n        '.join(repr(tuple(r)) for r in self.a.tolist())
+    return f'Matrix(({rows}))'
+
+  def __len__(self):  return len(self.a)
+  def __iter__(self): return (Vector(r) for r in self.a)
+
+  def __getitem__(self, i):
+    if isinstance(i, tuple): return float(self.a[i])
+    v = Vector.wrap(self.a[i])
+    v.is_frozen = self.is_frozen
+    return v
+
+  def __setitem__(self, i, xs):
+    self.check_mutable()
+    self.a[i] = components(xs)
+
+  @classmethod
+  def Identity(cls, n): return cls.wrap(np.identity(n))
+
+  @classmethod
+  def Diagonal(cls, v): return cls.wrap(np.diag(components(v)))
+
+  @classmethod
+  def Translation(cls, v):
+    a = np.identity(4)
+    a[:3, 3] = components(v)[:3]
+    return cls.wrap(a)
+
+  @classmethod
+  def Scale(cls, k, n, axis=None):
+    if axis is None: return cls.wrap(np.identity(n) * k)
+    d = components(axis)[:n]
+    d = d / np.linalg.norm(d)
+    return cls.wrap(np.identity(n) + (k - 1) * np.outer(d, d))
+
+  @classmethod
+  def Rotation(cls, angle, n, axis):
+    """
+    A rotation by angle radians about 'X', 'Y', or 'Z', or about an axis
+    vector, as an n x n matrix (n is 2, 3, or 4).
+    """
+    c, s = cos(angle), sin(angle)
+    if n == 2: return cls.wrap(np.array([[c, -s], [s, c]]))
+    if isinstance(axis, str):
+      axis = {'X': (1, 0, 0), 'Y': (0, 1, 0), 'Z': (0, 0, 1)}[axis.upper()]
+    x, y, z = components(axis)[:3] / np.linalg.norm(components(axis)[:3])
+    t = 1 - c
+    a = np.array([[t*x*x + c,   t*x*y - s*z, t*x*z + s*y],
+                  [t*x*y + s*z, t*y*y + c,   t*y*z - s*x],
+                  [t*x*z - s*y, t*y*z + s*x, t*z*z + c]])
+    return cls.wrap(a).to_4x4() if n == 4 else cls.wrap(a)
+
+  @property
+  def translation(self): return Vector(self.a[:3, 3])
+
+  @property
+  def col(self): return [Vector(c) for c in self.a.T]
+
+  @property
+  def row(self): return [Vector(r) for r in self.a]
+
+  def resized(self, n):
+    a = np.identity(n)
+    k = min(n, len(self.a))
+    a[:k, :k] = self.a[:k, :k]
+    return self.wrap(a)
+
+  def to_3x3(self): return self.resized(3)
+  def to_4x4(self): return self.resized(4)
+
+  def transposed(self):  return self.wrap(self.a.T.copy())
+  def inverted(self):    return self.wrap(np.linalg.inv(self.a))
+  def determinant(self): return float(np.linalg.det(self.a))
+
+  def to_quaternion(self):
+    m = self.a[:3, :3]
+    w = np.sqrt(max(0.0, 1 + np.trace(m))) / 2
+    if w > 1e-6:
+      return Quaternion((w, (m[2, 1] - m[1, 2]) / (4*w),
+                            (m[0, 2] - m[2, 0]) / (4*w),
+                            (m[1, 0] - m[0, 1]) / (4*w)))
+    i = int(np.argmax(np.diag(m)))
+    j, k = (i + 1) % 3, (i + 2) % 3
+    r = np.sqrt(max(0.0, 1 + m[i, i] - m[j, j] - m[k, k]))
+    q = np.zeros(4)
+    q[0]     = (m[k, j] - m[j, k]) / (2*r)
+    q[1 + i] = r / 2
+    q[1 + j] = (m[j, i] + m[i, j]) / (2*r)
+    q[1 + k] = (m[k, i] + m[i, k]) / (2*r)
+    return Quaternion(q)
+
+  def transform(self, points):
+    """
+    Applies this matrix to every row of points, an (N, k) array-like, and
+    returns an (N, k) array. A 4x4 matrix treats 3D rows as points.
+    """
+    p = np.asarray(points, dtype=np.float64)
+    n = len(self.a)
+    if p.shape[-1] == n: return p @ self.a.T
+    if n == 4 and p.shape[-1] == 3: return p @ self.a[:3, :3].T + self.a[:3, 3]
+    if n == 3 and p.shape[-1] == 4:
+      return np.concatenate([p[:, :3] @ self.a.T, p[:, 3:]], axis=1)
+    raise ValueError(
+      f'Matrix.transform(): can\'t apply a {n}x{n} matrix to {p.shape} points')
+
+  def __neg__(self):       return self.wrap(-self.a)
+  def __add__(self, m):    return self.wrap(self.a + components(m))
+  def __sub__(self, m):    return self.wrap(self.a - components(m))
+
+  def __mul__(self, k):
+    if isinstance(k, Matrix): return self.wrap(self.a * k.a)
+    if isinstance(k, (int, float)): return self.wrap(self.a * k)
+    return NotImplemented
+
+  __rmul__ = __mul__
+
+  def __matmul__(self, o):
+    if isinstance(o, Matrix):
+      n = max(len(self.a), len(o.a))
+      return self.wrap(self.resized(n).a @ o.resized(n).a)
+    if isinstance(o, Vector):
+      return Vector.wrap(self.transform(o.a[None, :])[0])
+    if isinstance(o, Quaternion):
+      return self @ o.to_matrix()
+    if isinstance(o, np.ndarray) and o.ndim == 2:
+      return self.transform(o)
+    return NotImplemented
+
+
+class Quaternion(mathvalue):
+  """
+  (w, x, y, z), like mathutils. Quaternion(axis, angle) is the rotation by
+  angle radians about axis.
+  """
+  __slots__ = ()
+
+  def __init__(self, xs=(1.0, 0.0, 0.0, 0.0), angle=None):
+    if angle is not None:
+      axis = components(xs)
+      axis = axis / np.linalg.norm(axis)
+      xs   = np.append(cos(angle / 2), axis * sin(angle / 2))
+    self.a         = components(xs).ravel()
+    self.is_frozen = False
+
+  def __repr__(self): return f'Quaternion({tuple(self.a.tolist())})'
+
+  def __getitem__(self, i): return float(self.a[i])
+
+  def __setitem__(self, i, x):
+    self.check_mutable()
+    self.a[i] = x
+
+  def component(i):
+    def get(self): return float(self.a[i])
+    def set(self, x): self[i] = x
+    return property(get, set)
+
+  w, x, y, z = map(component, range(4))
+  del component
+
+  @property
+  def angle(self): return 2 * float(np.arccos(np.clip(self.a[0], -1, 1)))
+
+  @property
+  def axis(self):
+    s = np.linalg.norm(self.a[1:])
+    return Vector(self.a[1:] / s if s else (0.0, 0.0, 1.0))
+
+  def normalized(self): return self.wrap(self.a / np.linalg.norm(self.a))
+  def conjugated(self): return self.wrap(self.a * (1, -1, -1, -1))
+  def inverted(self):   return self.wrap(self.conjugated().a / self.a.dot(self.a))
+
+  def to_matrix(self):
+    w, x, y, z = self.normalized().a
+    return Matrix.wrap(np.array(
+      [[1 - 2*(y*y + z*z), 2*(x*y - w*z),     2*(x*z + w*y)],
+       [2*(x*y + w*z),     1 - 2*(x*x + z*z), 2*(y*z - w*x)],
+       [2*(x*z - w*y),     2*(y*z + w*x),     1 - 2*(x*x + y*y)]]))
+
+  def __neg__(self): return self.wrap(-self.a)
+
+  def __matmul__(self, o):
+    if isinstance(o, Quaternion):
+      w1, x1, y1, z1 = self.a
+      w2, x2, y2, z2 = o.a
+      return self.wrap(np.array([w1*w2 - x1*x2 - y1*y2 - z1*z2,
+                                 w1*x2 + x1*w2 + y1*z2 - z1*y2,
+                                 w1*y2 - x1*z2 + y1*w2 + z1*x2,
+                                 w1*z2 + x1*y2 - y1*x2 + z1*w2]))
+    if isinstance(o, Vector):       return self.to_matrix() @ o
+    if isinstance(o, np.ndarray):   return self.to_matrix().transform(o)
+    return NotImplemented
@@ -0,0 +1,89 @@
+"""
+Parallel map over a process pool.
+
+*| f xs is f * xs computed in worker processes, in order, and returned as a
+tuple. Compiled BlendScript functions are Python closures and can't be
+pickled, so we ship them the same way compiler/aot.py does: as bytecode plus
+references to builtins by name, which each worker rebuilds once. That works
+for builtins and for any pure function with no free locals, which the
+compiler has already lifted to a global; plain picklable Python functions
+work too.
+
+We run serially instead when xs is short, when f can't be shipped (it closes
+over locals or refers to anything impure), or when pickling or anything on
+the worker side fails. A failure in f itself is then raised from the serial
+run, with a normal traceback.
+
+Workers are spawned rather than forked, since Blender runs several threads.
+As with any spawned multiprocessing pool, a Python script that uses *| needs
+an if __name__ == '__main__' guard, or each worker will rerun it.
+"""
+
+import os
+import pickle
+
+from concurrent.futures         import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing           import get_context
+
+from ..compiler.aot import portable, rebuild
+
+
+parallel_min_length = 4096
+chunks_per_worker   = 4
+
+pool         = None
+pool_workers = os.cpu_count() or 1
+
+
+def process_pool():
+  global pool
+  if pool is None:
+    pool = ProcessPoolExecutor(pool_workers, mp_context=get_context('spawn'))
+  return pool
+
+
+rebuilt = {}
+
+def run_chunk(desc, xs):
+  """
+  Worker side: maps the described function over a chunk of xs.
+  """
+  if desc not in rebuilt:
+    rebuilt[desc] = rebuild(desc[1]) if desc[0] == 'bs' \
+               else pickle.loads(desc[1])
+  f = rebuilt[desc]
+  return [f(x) for x in xs]
+
+
+def describe(f):
+  """
+  Returns a picklable description of f for run_chunk(), or None.
+  """
+  d = portable(f)
+  if d is not None: return ('bs', d)
+  try:
+    return ('py', pickle.dumps(f))
+  except Exception:
+    return None
+
+
+def parallel_map(f, xs):
+  xs = xs if isinstance(xs, (tuple, list)) else tuple(xs)
+  if len(xs) < parallel_min_length or pool_workers < 2:
+    return tuple(map(f, xs))
+
+  desc = describe(f)
+  if desc is None: return tuple(map(f, xs))
+
+  n = -(-len(xs) // (pool_workers * chunks_per_worker))
+  try:
+    rs = process_pool().map(run_chunk, [desc] * -(-len(xs) // n),
+                            [xs[i:i + n] for i in range(0, len(xs), n)])
+    return tuple(y for r in rs for y in r)
+  except BrokenProcessPool:
+    global pool
+    pool = None
+  except Exception:
+    pass
+  return tuple(map(f, xs))
@@ -0,0 +1,248 @@
+"""
+NumPy fast paths for f * xs, f % xs, and f / xs.
+
+Builtins that have an elementwise NumPy equivalent carry it as fn.vectorized
+(see val.of_fn()); partial applications carry it too, as long as the
+arguments they've been given are plain numbers. When xs is numeric -- a packed
+array, or a long enough tuple, list, or range of all ints or all floats -- the
+fn operators run the vectorized version in one call and return a
+packed_array, which behaves like the tuple the generic path would eventually
+produce.
+
+The generic path is the reference, so we fall back to it whenever NumPy might
+disagree with Python:
+
+- Non-finite float results; Python raises on most of those (division by zero,
+  domain errors, overflow) and we want it to.
+- Integer results that might have wrapped around, which we check against a
+  float shadow computation.
+- Integers big enough that converting them to floats would lose precision.
+- Bool inputs, since ~ and - mean different things to NumPy.
+- Any exception at all from the NumPy side.
+
+Only operations that IEEE 754 rounds correctly (arithmetic, sqrt, comparisons,
+and bitwise ops) are vectorized by default, so that a fast result is always
+bit-identical to the generic one; float reductions accumulate left to right for
+the same reason. NumPy's sin, exp, log, **, and the like can differ from
+Python's math library in the last bit, so they're marked inexact and only used
+after use_fast_math().
+
+Functions of vectors are vectorized with rowwise(), over the (N, 3) array of a
+vec3_array; they apply only to vec3_arrays, and the result is a vec3_array or
+a packed_array.
+"""
+
+from functools import partial
+
+from .arrays import packed_array, vec3_array
+
+
+class rowwise:
+  """
+  A vectorized function of vectors: f takes any bound arguments followed by an
+  (N, 3) array of points, and returns an (N, 3) or (N,) array.
+  """
+  __slots__ = ('f',)
+
+  def __init__(self, f):   self.f = f
+  def __call__(self, *xs): return self.f(*xs)
+
+
+class inexact:
+  """
+  A vectorized function that NumPy doesn't round correctly, so its results can
+  differ from the generic path's in the last bit. It's only used after
+  use_fast_math().
+  """
+  __slots__ = ('f',)
+
+  def __init__(self, f):   self.f = f
+  def __call__(self, *xs): return self.f(*xs)
+
+
+fast_math = False
+
+def use_fast_math(on=True):
+  """
+  Turns the NumPy versions of inexact functions on or off.
+  """
+  global fast_math
+  fast_math = on
+
+
+def enabled(vf):
+  """
+  Returns the function to run for vf, or None if vf is inexact and fast math
+  is off.
+  """
+  if not isinstance(vf, inexact): return vf
+  return vf.f if fast_math else None
+
+
+vector_min_length = 32
+exact_int_limit   = 2 ** 53
+int_result_limit  = 2 ** 62
+
+
+try:
+  import numpy as np
+  from .arrays import transform_rows
+
+  def ufunc(name, exact=True):
+    """
+    Returns the NumPy ufunc with the given name, marked inexact unless exact.
+    """
+    f = getattr(np, name)
+    return f if exact else inexact(f)
+
+  def arraywise(f, exact=True):
+    """
+    For functions like lambda x, y: y / x that only use operators NumPy
+    overloads, so f itself works elementwise on arrays. Returns (f, f), with
+    the second marked inexact unless exact.
+    """
+    return f, f if exact else inexact(f)
+
+  def as_array(xs):
+    """
+    Returns xs as a 1D int64 or float64 array, or None if it isn't a
+    homogeneous list of numbers we'd want to vectorize. Narrower packed data
+    is widened.
+    """
+    if isinstance(xs, packed_array):
+      a = np.asarray(xs.data)
+    elif isinstance(xs, np.ndarray):
+      a = xs
+    elif isinstance(xs, range):
+      if len(xs) < vector_min_length \
+         or max(abs(xs.start), abs(xs.stop)) >= exact_int_limit: return None
+      a = np.arange(xs.start, xs.stop, xs.step, dtype=np.int64)
+    elif isinstance(xs, (tuple, list)):
+      if len(xs) < vector_min_length: return None
+      t = type(xs[0])
+      if t is not int and t is not float: return None
+      for x in xs:
+        if type(x) is not t: return None
+      try:
+        a = np.array(xs, dtype=np.int64 if t is int else np.float64)
+      except OverflowError:
+        return None
+    else:
+      return None
+
+    if a.ndim != 1 or a.dtype.kind not in 'iuf' or len(a) == 0: return None
+
+    # Packed arrays from files can hold narrower types, but Python computes
+    # with unbounded ints and doubles, so widen them first
+    if a.dtype.kind == 'f': return a.astype(np.float64, copy=False)
+    if a.max() >= exact_int_limit or a.min() <= -exact_int_limit: return None
+    return a.astype(np.int64, copy=False)
+
+  def checked(r, a, shadow):
+    """
+    Returns r if it's an array result of the right shape that Python would
+    agree with, otherwise None.
+    """
+    if not isinstance(r, np.ndarray) or r.shape != a.shape: return None
+    k = r.dtype.kind
+    if k == 'f' and not np.isfinite(r).all(): return None
+    if k == 'i':
+      s = shadow(a.astype(np.float64))
+      if s is None or not np.all(np.abs(s) < int_result_limit): return None
+    return r if k in 'bif' else None
+
+  def attempt(f, *xs):
+    try:
+      with np.errstate(all='ignore'): return f(*xs)
+    except Exception:
+      return None
+
+  def rows_map(vf, xs):
+    if not isinstance(xs, vec3_array): return None
+    r = attempt(vf, xs.data)
+    if not isinstance(r, np.ndarray) or r.dtype.kind != 'f' \
+       or len(r) != len(xs.data) or not np.isfinite(r).all(): return None
+    if r.shape == xs.data.shape: return vec3_array(r)
+    if r.ndim == 1: return packed_array(memoryview(np.ascontiguousarray(r)))
+    return None
+
+  def rows_matmul(m, a):
+    """
+    m @ v for each row v of a: transformed points, or dot products if m is a
+    vector.
+    """
+    M = np.asarray(m, dtype=np.float64)
+    return a @ M if M.shape == (3,) else transform_rows(m, a)
+
+  def vector_map(vf, xs):
+    """
+    Returns vf * xs as a packed_array or vec3_array, or None to use the
+    generic path.
+    """
+    if isinstance(vf, rowwise): return rows_map(vf, xs)
+    vf = enabled(vf)
+    if vf is None: return None
+    a = as_array(xs)
+    if a is None: return None
+    r = checked(attempt(vf, a), a, lambda b: attempt(vf, b))
+    if r is None: return None
+    return packed_array(memoryview(np.ascontiguousarray(r)))
+
+  def vector_filter(vf, xs):
+    """
+    Returns vf % xs as a packed_array, or None to use the generic path.
+    """
+    vf = enabled(vf)
+    if vf is None or isinstance(vf, rowwise): return None
+    a = as_array(xs)
+    if a is None: return None
+    r = checked(attempt(vf, a), a, lambda b: attempt(vf, b))
+    if r is None: return None
+    return packed_array(memoryview(np.ascontiguousarray(a[r.astype(bool)])))
+
+  def vector_reduce(vf, xs):
+    """
+    Returns vf / xs as a number if vf is a ufunc with a reduction, or None to
+    use the generic path. Float reductions are sequential, like reduce(), since
+    NumPy's pairwise sums round differently.
+    """
+    vf     = enabled(vf)
+    reduce = getattr(vf, 'reduce', None)
+    if reduce is None: return None
+    a = as_array(xs)
+    if a is None: return None
+
+    if a.dtype.kind == 'f': r = attempt(lambda a: vf.accumulate(a)[-1], a)
+    else:                   r = attempt(reduce, a)
+    if not isinstance(r, np.generic) or r.dtype.kind not in 'bif': return None
+    if r.dtype.kind == 'f' and not np.isfinite(r): return None
+    if r.dtype.kind == 'i':
+      s = attempt(reduce, a.astype(np.float64))
+      if s is None or not abs(s) < int_result_limit: return None
+    return r.item()
+
+except ModuleNotFoundError:
+  def ufunc(name, exact=True):  return None
+  def arraywise(f, exact=True): return f, None
+  def rows_matmul(m, a):        return None
+  def vector_map(vf, xs):       return None
+  def vector_filter(vf, xs):    return None
+  def vector_reduce(vf, xs):    return None
+
+
+def bind_scalars(vf, xs):
+  """
+  Partially applies the vectorized function vf to xs if they're all plain
+  numbers; otherwise NumPy's broadcasting rules wouldn't match what f does.
+  rowwise functions take any arguments.
+  """
+  if vf is None: return None
+  if isinstance(vf, rowwise): return rowwise(partial(vf.f, *xs))
+  if isinstance(vf, inexact):
+    f = bind_scalars(vf.f, xs)
+    return f and inexact(f)
+  for x in xs:
+    if type(x) is float: continue
+    if type(x) is int and abs(x) < exact_int_limit: continue
+    return None
+  return partial(vf, *xs)